@@ -0,0 +1,135 @@
+"""
+Crypto backend benchmark for RSA-OAEP and bulk AES.
+
+Compares the installed backends on this machine so the faster one can be
+passed as `crypto_backend` to the client.
+
+    python benchmarks/bench_crypto.py --rounds 200 --messages 5000 --file-mb 16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stashconnect.crypto_utils import CRYPTO_BACKENDS, get_backend  # noqa: E402
+
+
+def available_backends() -> dict:
+    backends = {}
+
+    for name in CRYPTO_BACKENDS:
+        try:
+            backends[name] = get_backend(name)
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+
+    return backends
+
+
+def create_key(password: str) -> tuple[str, str]:
+    import Crypto.PublicKey.RSA
+
+    key = Crypto.PublicKey.RSA.generate(2048)
+    private_key = key.export_key(
+        passphrase=password, pkcs=8, protection="scryptAndAES128-CBC"
+    ).decode("utf-8")
+    return private_key, key.publickey().export_key().decode("utf-8")
+
+
+def check(backends: dict, private_pem: str) -> None:
+    """Runs the key paths of the client on every backend, also across backends."""
+    keys = {name: backend.load_private_key(private_pem, "benchmark") for name, backend in backends.items()}
+
+    for name, backend in backends.items():
+        # the creator key of a new chat is wrapped with the own public key
+        public_key = backend.public_key(keys[name])
+        key = backend.random_bytes(32)
+
+        exported = backend.export_private_key(keys[name])
+        restored = backend.load_private_key(exported, None)
+
+        wrapped = backend.encrypt_key(key, public_key)
+        assert backend.decrypt_key(wrapped, restored) == key, name
+
+        for other_name, other in backends.items():
+            assert other.decrypt_key(wrapped, keys[other_name]) == key, (name, other_name)
+
+        for wrapped in backend.encrypt_key_many(key, [public_key, public_key]):
+            assert backend.decrypt_key(wrapped, keys[name]) == key
+
+    print(f"key paths ok: {', '.join(backends)}")
+
+
+def timed(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - start
+
+
+def bench(backend, args, private_pem, public_pem) -> dict:
+    results = {}
+
+    start = time.perf_counter()
+    private_key = backend.load_private_key(private_pem, "benchmark")
+    results["key import (ms)"] = (time.perf_counter() - start) * 1000
+
+    public_key = backend.load_public_key(public_pem)
+    key = backend.random_bytes(32)
+    encrypted_key = backend.encrypt_key(key, public_key)
+
+    seconds = timed(lambda: backend.decrypt_key(encrypted_key, private_key), args.rounds)
+    results["oaep decrypt (ops/s)"] = args.rounds / seconds
+
+    seconds = timed(lambda: backend.encrypt_key(key, public_key), args.rounds)
+    results["oaep encrypt (ops/s)"] = args.rounds / seconds
+
+    # a page of short chat messages
+    iv = backend.random_bytes(16)
+    texts = [os.urandom(40 + index % 200) for index in range(args.messages)]
+    items = [(backend.encrypt_aes(text, key, iv), iv) for text in texts]
+
+    seconds = timed(lambda: [backend.decrypt_aes(e, key, iv) for e, iv in items], 1)
+    results["aes messages one by one (msg/s)"] = args.messages / seconds
+
+    seconds = timed(lambda: backend.decrypt_many(items, key), 1)
+    results["aes decrypt_many (msg/s)"] = args.messages / seconds
+
+    # a file chunk
+    data = os.urandom(args.file_mb * 1024 * 1024)
+    encrypted = backend.encrypt_aes(data, key, iv)
+
+    seconds = timed(lambda: backend.encrypt_aes(data, key, iv), 1)
+    results["aes file encrypt (MB/s)"] = args.file_mb / seconds
+
+    seconds = timed(lambda: backend.decrypt_aes(encrypted, key, iv), 1)
+    results["aes file decrypt (MB/s)"] = args.file_mb / seconds
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--file-mb", type=int, default=16)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    private_pem, public_pem = create_key("benchmark")
+    check(backends, private_pem)
+
+    results = {name: bench(backend, args, private_pem, public_pem) for name, backend in backends.items()}
+
+    names = list(results)
+    print(f"{'':34}" + "".join(f"{name:>16}" for name in names))
+
+    for metric in results[names[0]]:
+        print(f"{metric:34}" + "".join(f"{results[name][metric]:>16.1f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
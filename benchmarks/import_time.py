@@ -0,0 +1,79 @@
+"""
+Import time benchmark for `import stashconnect`.
+
+Runs the import in fresh interpreters and fails if it gets slower than the
+budget or if a heavy dependency is imported eagerly again.
+
+    python benchmarks/import_time.py --runs 10 --max-ms 150
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that should only be loaded on first use
+LAZY_MODULES = [
+    "socketio",
+    "PIL.Image",
+    "Crypto.PublicKey.RSA",
+    "Crypto.Cipher.AES",
+    "requests",
+]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import stashconnect
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def measure(runs: int) -> tuple[list, set]:
+    timings = []
+    eager = set()
+
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(modules=LAZY_MODULES)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+
+        timings.append(float(output[0]) * 1000)
+        eager.update(name for name in output[1].split(",") if name)
+
+    return timings, eager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    timings, eager = measure(args.runs)
+    median = statistics.median(timings)
+
+    print(f"import stashconnect: median {median:.1f}ms, min {min(timings):.1f}ms")
+
+    failed = False
+    if eager:
+        print(f"eagerly imported: {', '.join(sorted(eager))}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"over budget of {args.max_ms:.1f}ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,10 +33,14 @@ setup(
     install_requires=[
         "requests",
         "pycryptodome",
-        "python-socketio",
+        "python-socketio>=5.10",
         "Pillow",
         "websocket-client",
     ],
+    extras_require={
+        "pool": ["aiohttp"],
+        "openssl": ["cryptography"],
+    },
     project_urls={
         "Bug Tracker": "https://github.com/BuStudios/StashConnect/issues",
         "Documentation": "https://github.com/BuStudios/StashConnect/wiki",
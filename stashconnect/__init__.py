@@ -10,3 +10,6 @@ An API wrapper for [Stashcat](https://stashcat.com/en).
 __version__ = "0.9.7"
 
 from .client import *
+from .pool import ClientPool
+from .sharding import run_sharded
+from .replay import EventRecorder, Replayer
@@ -1,5 +1,3 @@
-from PIL import Image
-import requests
 import io
 import base64
 
@@ -144,6 +142,9 @@ class AccountManager:
         #### Returns:
             User: A user object.
         """
+        import requests
+        from PIL import Image
+
         response = requests.get(url)
         response.raise_for_status()
 
@@ -0,0 +1,102 @@
+import collections
+import threading
+import time
+from copy import deepcopy
+
+
+class TTLCache:
+    """## A thread-safe LRU cache whose entries expire.
+
+    One cache can be shared by several clients. Entries that depend on the
+    account use keys containing the accounts user id. Mutable values should
+    be read with `copy=True`, so a caller can not change them for others.
+
+    #### Attributes:
+        .ttl (float): Seconds until an entry expires (None never expires).
+        .maxsize (int): The maximum amount of entries.
+        .hits (int): The amount of cache hits.
+        .misses (int): The amount of cache misses.
+    """
+
+    def __init__(self, ttl: float = 300, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None, *, copy: bool = False):
+        """## Returns a cached value.
+
+        #### Args:
+            key: The key.
+            default (optional): Returned if the key is missing or expired. Defaults to None.
+            copy (bool, optional): Return a deep copy of the value. Defaults to False.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or (entry[1] is not None and entry[1] < time.monotonic()):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+
+        return deepcopy(value) if copy else value
+
+    def set(self, key, value, ttl: float = -1) -> None:
+        """## Stores a value.
+
+        #### Args:
+            key: The key.
+            value: The value.
+            ttl (float, optional): A custom ttl for this entry. Defaults to the cache ttl.
+        """
+        ttl = self.ttl if ttl == -1 else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl: float = -1, *, copy: bool = False):
+        """## Returns a cached value or stores the result of factory().
+
+        #### Args:
+            key: The key.
+            factory (callable): Creates the value on a miss.
+            ttl (float, optional): A custom ttl for a new entry. Defaults to the cache ttl.
+            copy (bool, optional): Return a deep copy of the value. Defaults to False.
+        """
+        missing = object()
+        value = self.get(key, missing, copy=copy)
+
+        if value is missing:
+            value = factory()
+            self.set(key, value, ttl)
+
+            if copy:
+                value = deepcopy(value)
+
+        return value
+
+    def delete(self, key) -> None:
+        """## Removes a key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """## Removes all entries."""
+        with self._lock:
+            self._entries.clear()
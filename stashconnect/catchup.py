@@ -0,0 +1,252 @@
+import concurrent.futures
+import threading
+import time
+
+
+class CatchUp:
+    """## Fetches the messages missed while the push socket was down.
+
+    The last seen message id of every chat is tracked from the live events.
+    After a reconnect the newer messages are fetched through message/content,
+    page by page until the last seen id is reached, and handed to the normal
+    handlers in order. Chats without a live message since the first connect
+    are found through the chat listing and caught up from that time.
+
+    Only the events in `events` carry new messages, so only their handlers
+    get the fetched messages. A live event is only dropped if it repeats a
+    message that the catch up replayed to the same event, within `window`
+    seconds after the catch up. If a chat missed more than `max_messages`
+    messages, the older ones are skipped and the gap is recorded.
+
+    #### Attributes:
+        .events (tuple): The event names that new messages are replayed to.
+        .limit (int): The messages fetched per request.
+        .max_messages (int): The maximum amount of messages fetched per chat.
+        .concurrency (int): The maximum amount of parallel requests.
+        .window (float): Seconds a replayed message is remembered for deduplication.
+        .since (float): The unix time of the first connect (or None).
+        .last_seen (dict): The last seen message id per (type, id) chat.
+        .delivered (int): The amount of caught up messages.
+        .gaps (list): The chats that missed more than max_messages, with their last seen
+            and oldest fetched message id.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        limit: int = 50,
+        max_messages: int = 1000,
+        concurrency: int = 4,
+        window: float = 60,
+        events: tuple = ("message_sync",),
+    ):
+        self.client = client
+        self.events = tuple(events)
+        self.limit = limit
+        self.max_messages = max_messages
+        self.concurrency = concurrency
+        self.window = window
+
+        self.since = None
+        self.last_seen = {}
+        self.delivered = 0
+        self.gaps = []
+
+        # (event name, message id) of replayed messages mapped to their expiry
+        self._replayed = {}
+
+        self._lock = threading.Lock()
+        self._active = False
+        self._buffer = []
+
+    def observe(self, name: str, args: tuple) -> bool:
+        """## Tracks a live event.
+
+        #### Args:
+            name (str): The event name.
+            args (tuple): The raw event arguments.
+
+        #### Returns:
+            bool: False if the event repeats a message the catch up already delivered.
+        """
+        if not args or not isinstance(args[0], dict):
+            return True
+
+        message = args[0].get("message")
+        if not isinstance(message, dict) or "id" not in message:
+            return True
+
+        message_id = int(message["id"])
+
+        with self._lock:
+            expiry = self._replayed.pop((name, message_id), None)
+            if expiry is not None and expiry > time.monotonic():
+                return False
+
+            if name in self.events:
+                self._track(message, message_id)
+
+        return True
+
+    def _track(self, message, message_id):
+        if message.get("channel_id"):
+            chat = ("channel", str(message["channel_id"]))
+        else:
+            chat = ("conversation", str(message["conversation_id"]))
+
+        if message_id > self.last_seen.get(chat, 0):
+            self.last_seen[chat] = message_id
+
+    def hold(self, name: str, args: tuple) -> bool:
+        """## Buffers live events while a catch up is running.
+
+        #### Returns:
+            bool: True if the event was buffered and will be delivered later.
+        """
+        with self._lock:
+            if self._active:
+                self._buffer.append((name, args))
+                return True
+            return False
+
+    def connected(self, deliver) -> None:
+        """## Records the first connect and catches up after every reconnect.
+
+        #### Args:
+            deliver (callable): Called with (name, args) for every event.
+        """
+        if self.since is None:
+            self.since = time.time()
+        else:
+            self.start(deliver)
+
+    def start(self, deliver) -> None:
+        """## Starts a catch up in the background.
+
+        #### Args:
+            deliver (callable): Called with (name, args) for every event.
+        """
+        with self._lock:
+            if self._active:
+                return
+            self._active = True
+
+        thread = threading.Thread(target=self.run, args=(deliver,), daemon=True)
+        thread.start()
+
+    def run(self, deliver) -> int:
+        """## Fetches and delivers the missed messages.
+
+        #### Args:
+            deliver (callable): Called with (name, args) for every event.
+
+        #### Returns:
+            int: The amount of delivered messages.
+        """
+        with self._lock:
+            self._active = True
+            now = time.monotonic()
+            self._replayed = {
+                key: expiry for key, expiry in self._replayed.items() if expiry > now
+            }
+            chats = {chat: (last_id, None) for chat, last_id in self.last_seen.items()}
+
+        names = [name for name in self.events if name in self.client.events]
+
+        try:
+            for chat in self._quiet_chats(chats):
+                chats[chat] = (0, self.since)
+
+            with concurrent.futures.ThreadPoolExecutor(self.concurrency) as executor:
+                pages = executor.map(lambda item: self._fetch(item[0], *item[1]), chats.items())
+                missed = [message for page in pages for message in page]
+
+            missed.sort(key=lambda message: (message.get("time", 0), int(message["id"])))
+            expiry = time.monotonic() + self.window
+
+            with self._lock:
+                for message in missed:
+                    self._track(message, int(message["id"]))
+                    for name in names:
+                        self._replayed[(name, int(message["id"]))] = expiry
+
+            for message in missed:
+                for name in names:
+                    deliver(name, ({"message": message},))
+
+            delivered = len(missed) if names else 0
+            self.delivered += delivered
+            return delivered
+
+        except Exception as e:
+            print(f"Could not catch up on missed messages: {e!r}")
+            return 0
+
+        finally:
+            self._flush(deliver)
+
+    def _quiet_chats(self, known) -> list:
+        # chats without a live message are only known from the listing
+        if self.since is None:
+            return []
+
+        try:
+            listed, _ = self.client.chats._list(full=True)
+        except Exception as e:
+            print(f"Could not list the chats to catch up: {e!r}")
+            return []
+
+        return [
+            chat
+            for chat, data in listed.items()
+            if chat not in known and int(data.get("last_action") or 0) >= int(self.since)
+        ]
+
+    def _fetch(self, chat, last_id, since=None):
+        chat_type, chat_id = chat
+        missed = []
+
+        while len(missed) < self.max_messages:
+            limit = min(self.limit, self.max_messages - len(missed))
+            response = self.client._post(
+                "message/content",
+                data={
+                    f"{chat_type}_id": chat_id,
+                    "source": chat_type,
+                    "limit": limit,
+                    "offset": len(missed),
+                },
+            )
+            page = response["messages"]
+
+            for message in page:
+                if int(message["id"]) <= last_id or (
+                    since is not None and int(message.get("time") or 0) < since
+                ):
+                    return [message for message in missed if message["kind"] == "message"]
+                missed.append(message)
+
+            if len(page) < limit:
+                return [message for message in missed if message["kind"] == "message"]
+
+        oldest = min((int(message["id"]) for message in missed), default=None)
+        with self._lock:
+            self.gaps.append({"chat": chat, "last_seen": last_id, "oldest": oldest})
+        print(
+            f"Catch up of {chat_type} {chat_id} stopped after {len(missed)} messages, "
+            "older missed messages are skipped"
+        )
+        return [message for message in missed if message["kind"] == "message"]
+
+    def _flush(self, deliver):
+        while True:
+            with self._lock:
+                if not self._buffer:
+                    self._active = False
+                    return
+                buffered, self._buffer = self._buffer, []
+
+            for name, args in buffered:
+                if self.observe(name, args):
+                    deliver(name, args)
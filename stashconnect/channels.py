@@ -1,22 +1,111 @@
-import Crypto.Cipher
-import Crypto.Cipher.AES
-import Crypto.Cipher.PKCS1_OAEP
-import Crypto.PublicKey
-import Crypto.PublicKey.RSA
-import Crypto.Random
-import Crypto
-
-import base64
+import csv
 import json
+import os
+import threading
 
+from .directory import ChannelDirectory
 from .models import User, Channel
+from .timeouts import map_concurrent, with_deadline
 from typing import Generator
 
 
+def _is_manager(member: dict) -> bool:
+    # the manager flag is sent on the member or in its membership
+    membership = member.get("membership") or {}
+    return bool(member.get("manager") or membership.get("may_manage"))
+
+
+def _id_list(value) -> list:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = value.replace(",", ";").split(";")
+    elif isinstance(value, int):
+        value = [value]
+    return [str(user_id).strip() for user_id in value if str(user_id).strip()]
+
+
+def _read_specs(path: str) -> list:
+    with open(path, newline="", encoding="utf-8") as file:
+        return [dict(row) for row in csv.DictReader(file)]
+
+
+class ProgressLog:
+    """## Remembers the finished steps of a bulk operation in a JSONL file.
+
+    Every step is appended as one line, and the last line of a spec wins
+    when the log is read again. The users invited so far are carried along,
+    so a run can continue in the middle of the invites.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._states = {}
+        self._lock = threading.Lock()
+        self._file = None
+
+        if path is None:
+            return
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._states[(entry["company"], entry["name"])] = entry
+
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def state(self, spec: dict) -> dict:
+        """## Returns the last logged step of a spec."""
+        state = self._states.get((str(spec["company"]), spec["name"]), {})
+
+        # failed runs continue after their last successful step
+        if state.get("step") == "failed":
+            state = {**state, "step": state.get("last_step")}
+        return state
+
+    def write(self, spec, step, channel_id, *, error=None, invited=None) -> None:
+        """## Logs a finished step of a spec."""
+        key = (str(spec["company"]), spec["name"])
+
+        with self._lock:
+            previous = self._states.get(key, {})
+            last_step = previous.get("last_step") if step == "failed" else step
+
+            entry = {
+                "name": spec["name"],
+                "company": str(spec["company"]),
+                "channel_id": channel_id,
+                "step": step,
+                "last_step": last_step,
+                "invited": previous.get("invited", []) if invited is None else invited,
+                "error": error,
+            }
+            self._states[key] = entry
+
+            if self._file is not None:
+                self._file.write(json.dumps(entry) + "\n")
+                self._file.flush()
+
+    def close(self) -> None:
+        """## Closes the log file."""
+        if self._file is not None:
+            self._file.close()
+
+
 class ChannelManager:
     def __init__(self, client):
         self.client = client
+        self._directories = {}
 
+    @with_deadline
     def create(
         self,
         channel_name: str,
@@ -44,14 +133,48 @@ class ChannelManager:
             inviteable (str, optional): Sets who can invite other users. Defaults to "all".
             show_activities (bool, optional): [name]. Defaults to True.
             show_membership_activities (bool, optional): [name]. Defaults to True.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             Channel: A channel object.
         """
-        conversation_key = Crypto.Random.get_random_bytes(32)
-        encryptor = Crypto.Cipher.PKCS1_OAEP.new(self.client._private_key.publickey())
+        channel = self._create(
+            channel_name,
+            company_id,
+            description=description,
+            password=password,
+            channel_type=channel_type,
+            visible=visible,
+            writable=writable,
+            inviteable=inviteable,
+            show_activities=show_activities,
+            show_membership_activities=show_membership_activities,
+        )
+        return Channel(self.client, channel)
 
-        encrypted_key = encryptor.encrypt(conversation_key)
+    def _create(
+        self,
+        channel_name: str,
+        company_id: int | str,
+        *,
+        description: str = "",
+        password: str = None,
+        channel_type: str = "encrypted",
+        visible: bool = True,
+        writable: str = "all",
+        inviteable: str = "all",
+        show_activities: bool = True,
+        show_membership_activities: bool = True,
+    ) -> dict:
+        """## Creates a channel and returns it as a dict.
+
+        #### Returns:
+            dict: The channel as a dict.
+        """
+        conversation_key = self.client.crypto.random_bytes(32)
+        encrypted_key = self.client.crypto.encrypt_key(
+            conversation_key, self.client.crypto.public_key(self.client._private_key)
+        )
 
         data = {
             "channel_name": channel_name,
@@ -62,14 +185,18 @@ class ChannelManager:
             "type": channel_type,
             "visible": visible,
             "writable": writable,
-            "encryption_key": base64.b64encode(encrypted_key).decode("utf-8"),
+            "encryption_key": encrypted_key,
             "inviteable": inviteable,
             "show_activities": show_activities,
             "show_membership_activities": show_membership_activities,
         }
 
         response = self.client._post("channels/create", data=data)
-        return Channel(self.client, response["channel"])
+        channel = response["channel"]
+
+        # the key is known, so invites do not have to fetch and decrypt it again
+        self.client.conversation_keys[channel["id"]] = conversation_key
+        return channel
 
     def edit(
         self,
@@ -273,12 +400,14 @@ class ChannelManager:
         )
         return response["channels"]
 
+    @with_deadline
     def info(self, channel_id: int | str, without_members: bool = True) -> Channel:
         """## Gets the info of a channel.
 
         #### Args:
             channel_id (int | str): The channels id.
             without_members (bool, optional): Returns the members. Defaults to True.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             Channel: A channel object.
@@ -289,6 +418,7 @@ class ChannelManager:
         )
         return Channel(self.client, response["channels"])
 
+    @with_deadline
     def invite(
         self,
         channel_id: int | str,
@@ -303,6 +433,7 @@ class ChannelManager:
             members (int | str | list | tuple): Members to invite as a list or string.
             text (str, optional): The text invited users will become. Defaults to "".
             expiry (int | str, optional): Expiry time as a unix timestamp. Defaults to None.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             dict: The success status.
@@ -314,17 +445,17 @@ class ChannelManager:
         if isinstance(members, str | int):
             members = [members]
 
-        for member in members:
-            user = self.client.users._info(member)
-
-            publickey = Crypto.PublicKey.RSA.import_key(user["public_key"])
-            encryptor = Crypto.Cipher.PKCS1_OAEP.new(publickey)
-            encrypted_key = encryptor.encrypt(conversation_key)
+        # fetch all keys at once and wrap the channel key for every member
+        public_keys = self.client.users.public_keys(members)
+        encrypted_keys = self.client.crypto.encrypt_key_many(
+            conversation_key, [key for _, key in public_keys.values()], workers=4
+        )
 
+        for (user, _), encrypted_key in zip(public_keys.values(), encrypted_keys):
             users.append(
                 {
                     "id": int(user["id"]),
-                    "key": base64.b64encode(encrypted_key).decode("utf-8"),
+                    "key": encrypted_key,
                     "expiry": expiry,
                     "userVerified": True,
                 }
@@ -341,6 +472,7 @@ class ChannelManager:
 
         return response
 
+    @with_deadline
     def members(
         self,
         channel_id: int | str,
@@ -356,11 +488,37 @@ class ChannelManager:
             search (str | int, optional): The search keyword that is used. Defaults to None.
             limit (int | str, optional): Limit of answer. Defaults to 40.
             offset (int | str, optional): Offset of answer. Defaults to 0.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Yields:
             Generator[User, None, None]: A generator object with a User object
             (use: for member in members).
         """
+        for member in self._members(channel_id, limit=limit, offset=offset, search=search):
+            yield User(self.client, member)
+
+    def _members(
+        self,
+        channel_id: int | str,
+        *,
+        limit: int | str = 40,
+        offset: int | str = 0,
+        search: str | int = None,
+    ) -> list:
+        """## Fetches one page of channel members (dicts).
+
+        #### Args:
+            channel_id (int | str): The channels id.
+            limit (int | str, optional): Limit of answer. Defaults to 40.
+            offset (int | str, optional): Offset of answer. Defaults to 0.
+            search (str | int, optional): The search keyword that is used. Defaults to None.
+
+        #### Returns:
+            list: The members as dicts.
+        """
+        return self._members_page(channel_id, limit, offset, search)["members"]
+
+    def _members_page(self, channel_id, limit, offset, search=None) -> dict:
         data = {
             "channel_id": channel_id,
             "limit": limit,
@@ -370,10 +528,433 @@ class ChannelManager:
             "search": search,
         }
 
-        response = self.client._post("channels/members", data=data)
+        return self.client._post("channels/members", data=data)
 
-        for member in response["members"]:
-            yield User(self.client, member)
+    @with_deadline
+    def members_all(
+        self,
+        channel_id: int | str,
+        *,
+        raw: bool = False,
+        search: str | int = None,
+        page_size: int = 40,
+        concurrency: int = 8,
+    ) -> Generator[User | dict, None, None]:
+        """## Lists all members of a channel, fetching the pages concurrently.
+
+        Once the first page shows the member count, the other pages are
+        requested in parallel and their members are yielded as the pages
+        arrive (not sorted). Without a count the pages are fetched one after
+        another.
+
+        #### Args:
+            channel_id (int | str): The channels id.
+            raw (bool, optional): Yield the member dicts instead of User objects. Defaults to False.
+            search (str | int, optional): The search keyword that is used. Defaults to None.
+            page_size (int, optional): The members per request. Defaults to 40.
+            concurrency (int, optional): The maximum amount of parallel requests. Defaults to 8.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
+
+        #### Yields:
+            Generator[User | dict, None, None]: Every member once.
+        """
+        seen = set()
+
+        def new_members(page):
+            for member in page:
+                # members joining while paging can shift a member onto two pages
+                if str(member["id"]) not in seen:
+                    seen.add(str(member["id"]))
+                    yield member if raw else User(self.client, member)
+
+        first = self._members_page(channel_id, page_size, 0, search)
+        yield from new_members(first["members"])
+
+        if len(first["members"]) < page_size:
+            return
+
+        total = first.get("num_members")
+        if total is None and search is None:
+            total = self._info(channel_id).get("user_count")
+
+        if total is None:
+            offset = page_size
+            while True:
+                page = self._members(
+                    channel_id, limit=page_size, offset=offset, search=search
+                )
+                yield from new_members(page)
+
+                if len(page) < page_size:
+                    return
+                offset += page_size
+
+        import concurrent.futures
+        import contextvars
+
+        # one extra page catches members that joined since the count
+        offsets = range(page_size, int(total) + page_size, page_size)
+        executor = concurrent.futures.ThreadPoolExecutor(concurrency)
+
+        try:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._members,
+                    channel_id,
+                    limit=page_size,
+                    offset=offset,
+                    search=search,
+                )
+                for offset in offsets
+            ]
+
+            for future in concurrent.futures.as_completed(futures):
+                yield from new_members(future.result())
+        finally:
+            # stops the remaining pages if the caller breaks early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @with_deadline
+    def sync_members(
+        self,
+        channel_id: int | str,
+        desired_ids: list,
+        *,
+        managers: list = None,
+        remove: bool = True,
+        dry_run: bool = False,
+        text: str = "",
+        expiry: int | str = None,
+        invite_batch: int = 100,
+        concurrency: int = 8,
+    ) -> dict:
+        """## Brings the members of a channel in line with a list of user ids.
+
+        Missing users are invited in batches, users that are not in the list
+        are removed and the manager status is added or removed. Users whose
+        key can not be fetched are skipped and reported in the errors. The client
+        itself is never removed or demoted. Invited users can only be promoted
+        once they joined, so invited managers are reported as pending and are
+        promoted by a later sync.
+
+        #### Args:
+            channel_id (int | str): The channels id.
+            desired_ids (list): The user ids that should be members.
+            managers (list, optional): The user ids that should be managers. Defaults to None
+                (manager status is not changed).
+            remove (bool, optional): Remove members that are not in desired_ids. Defaults to True.
+            dry_run (bool, optional): Only compute the changes. Defaults to False.
+            text (str, optional): The text of the invites. Defaults to "".
+            expiry (int | str, optional): Expiry time of the invites as a unix timestamp.
+            invite_batch (int, optional): The users per invite request. Defaults to 100.
+            concurrency (int, optional): The maximum amount of parallel requests. Defaults to 8.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
+
+        #### Returns:
+            dict: The invited, removed, promoted, demoted and pending manager user ids,
+            the amount of unchanged members and the errors.
+        """
+        own_id = str(self.client.user_id)
+        desired = list(dict.fromkeys(str(user_id) for user_id in desired_ids))
+
+        current = {
+            str(member["id"]): member
+            for member in self.members_all(channel_id, raw=True, concurrency=concurrency)
+        }
+
+        to_invite = [user_id for user_id in desired if user_id not in current]
+        to_remove = []
+        if remove:
+            to_remove = [
+                user_id
+                for user_id in current
+                if user_id not in desired and user_id != own_id
+            ]
+
+        to_promote, to_demote, pending = [], [], []
+        if managers is not None:
+            managers = {str(user_id) for user_id in managers}
+            staying = [user_id for user_id in current if user_id not in to_remove]
+
+            to_promote = [
+                user_id
+                for user_id in staying
+                if user_id in managers and not _is_manager(current[user_id])
+            ]
+            to_demote = [
+                user_id
+                for user_id in staying
+                if user_id not in managers
+                and user_id != own_id
+                and _is_manager(current[user_id])
+            ]
+            pending = [user_id for user_id in to_invite if user_id in managers]
+
+        changed = set(to_remove) | set(to_promote) | set(to_demote)
+
+        report = {
+            "dry_run": dry_run,
+            "invited": to_invite,
+            "removed": to_remove,
+            "promoted": to_promote,
+            "demoted": to_demote,
+            "pending_managers": pending,
+            "unchanged": sum(user_id not in changed for user_id in current),
+            "errors": [],
+        }
+
+        if dry_run:
+            return report
+
+        def apply(action, endpoint, user_ids):
+            def run(user_id):
+                try:
+                    # no Channel object is built for every single change
+                    self.client._post(
+                        endpoint, data={"channel_id": channel_id, "user_id": user_id}
+                    )
+                    return user_id, None
+                except Exception as e:
+                    return user_id, e
+
+            done = []
+            for user_id, error in map_concurrent(run, user_ids, concurrency):
+                if error is None:
+                    done.append(user_id)
+                else:
+                    report["errors"].append(
+                        {"action": action, "user_id": user_id, "error": repr(error)}
+                    )
+            report[action] = done
+
+        # a user whose key can not be fetched must not fail the whole batch
+        key_errors = self._prefetch_keys(to_invite, concurrency)
+        report["errors"].extend(
+            {"action": "invited", "user_id": user_id, "error": error}
+            for user_id, error in key_errors.items()
+        )
+        to_invite = [user_id for user_id in to_invite if user_id not in key_errors]
+
+        invited = []
+        for start in range(0, len(to_invite), invite_batch):
+            batch = to_invite[start : start + invite_batch]
+            try:
+                # one request with the channel key wrapped for every user of the batch
+                self.invite(channel_id, batch, text=text, expiry=expiry)
+                invited.extend(batch)
+            except Exception as e:
+                report["errors"].extend(
+                    {"action": "invited", "user_id": user_id, "error": repr(e)}
+                    for user_id in batch
+                )
+        report["invited"] = invited
+        report["pending_managers"] = [user_id for user_id in pending if user_id in invited]
+
+        apply("removed", "channels/removeUser", to_remove)
+        apply("promoted", "channels/addModeratorStatus", to_promote)
+        apply("demoted", "channels/removeModeratorStatus", to_demote)
+
+        return report
+
+    def provision(
+        self,
+        specs: list | str,
+        *,
+        concurrency: int = 4,
+        progress_log: str = None,
+        text: str = "",
+        invite_batch: int = 100,
+    ) -> list:
+        """## Creates many channels and invites their members.
+
+        A spec has a name, company, description, members and managers (ids as
+        a list or separated by ";"). Managers are invited like members, and a
+        name has to be unique per company. All member keys are fetched once up
+        front and reused for every channel, and the channels are created
+        concurrently. Members whose key can not be fetched are skipped and
+        reported for their spec.
+
+        With a progress_log every finished step and invite batch is appended
+        to a JSONL file. Running provision again with the same log skips the
+        finished channels and continues unfinished ones after their last step
+        or invite batch.
+
+        Managers are promoted after the invites, once they joined the channel.
+        Until all of them joined, the spec stays "pending" and the next run
+        promotes the ones that joined meanwhile.
+
+        #### Args:
+            specs (list | str): The channel definitions as dicts, or the path of a CSV file.
+            concurrency (int, optional): Channels created in parallel. Defaults to 4.
+            progress_log (str, optional): The path of the progress log. Defaults to None.
+            text (str, optional): The text of the invites. Defaults to "".
+            invite_batch (int, optional): The users per invite request. Defaults to 100.
+
+        #### Returns:
+            list: A result per spec with name, company, channel_id, status ("done",
+            "pending" or "failed"), error, the member_errors of skipped members and
+            the pending_managers.
+        """
+        if isinstance(specs, str):
+            specs = _read_specs(specs)
+
+        specs = [
+            {
+                **spec,
+                # managers have to be invited before they can be promoted
+                "members": list(
+                    dict.fromkeys(
+                        _id_list(spec.get("members")) + _id_list(spec.get("managers"))
+                    )
+                ),
+                "managers": _id_list(spec.get("managers")),
+            }
+            for spec in specs
+        ]
+
+        # the progress log keys the specs by company and name
+        seen = set()
+        for spec in specs:
+            key = (str(spec["company"]), spec["name"])
+            if key in seen:
+                raise ValueError(f"Duplicate channel {spec['name']} in company {spec['company']}")
+            seen.add(key)
+
+        with ProgressLog(progress_log) as progress:
+            finished = [progress.state(spec).get("step") == "done" for spec in specs]
+            pending = [spec for spec, done in zip(specs, finished) if not done]
+
+            # one prefetch fills the key cache for all channels; a bad id only
+            # affects the specs that name it
+            key_errors = self._prefetch_keys(
+                user_id for spec in pending for user_id in spec["members"]
+            )
+
+            def provision_one(spec):
+                state = progress.state(spec)
+                step = state.get("step")
+                channel_id = state.get("channel_id")
+                invited = list(state.get("invited") or [])
+
+                member_errors = [
+                    {"user_id": user_id, "error": key_errors[user_id]}
+                    for user_id in spec["members"]
+                    if user_id in key_errors
+                ]
+                outcome = {
+                    "status": "failed",
+                    "error": None,
+                    "channel_id": channel_id,
+                    "member_errors": member_errors,
+                    "pending_managers": [],
+                }
+
+                try:
+                    if channel_id is None:
+                        channel = self._create(
+                            spec["name"],
+                            spec["company"],
+                            description=spec.get("description") or "",
+                        )
+                        channel_id = outcome["channel_id"] = channel["id"]
+                        step = "created"
+                        progress.write(spec, step, channel_id, invited=[])
+
+                    if step in ("created", "inviting"):
+                        to_invite = [
+                            user_id
+                            for user_id in spec["members"]
+                            if user_id not in invited and user_id not in key_errors
+                        ]
+
+                        for start in range(0, len(to_invite), invite_batch):
+                            batch = to_invite[start : start + invite_batch]
+                            self.invite(channel_id, batch, text=text)
+
+                            # every batch is logged, so a rerun never sends it again
+                            invited.extend(batch)
+                            progress.write(spec, "inviting", channel_id, invited=invited)
+
+                        step = "invited"
+                        progress.write(spec, step, channel_id)
+
+                    # managers without a key were never invited, they are in member_errors
+                    managers = [
+                        user_id for user_id in spec["managers"] if user_id not in key_errors
+                    ]
+                    if managers:
+                        outcome["pending_managers"] = self._promote_members(
+                            channel_id, managers
+                        )
+
+                    if outcome["pending_managers"]:
+                        outcome["status"] = "pending"
+                    else:
+                        progress.write(spec, "done", channel_id)
+                        outcome["status"] = "done"
+                    return outcome
+
+                except Exception as e:
+                    progress.write(spec, "failed", channel_id, error=repr(e))
+                    outcome["error"] = repr(e)
+                    return outcome
+
+            outcomes = iter(map_concurrent(provision_one, pending, concurrency))
+            results = []
+
+            for spec, done in zip(specs, finished):
+                if done:
+                    outcome = {
+                        "status": "done",
+                        "error": None,
+                        "channel_id": progress.state(spec)["channel_id"],
+                        "member_errors": [],
+                        "pending_managers": [],
+                    }
+                else:
+                    outcome = next(outcomes)
+
+                results.append({"name": spec["name"], "company": spec["company"], **outcome})
+
+        return results
+
+    def _prefetch_keys(self, user_ids, concurrency: int = 8) -> dict:
+        # fetched per id, so an unknown or stale id does not fail the others
+        def prefetch(user_id):
+            try:
+                self.client.users.public_keys([user_id], concurrency=1)
+                return None
+            except Exception as e:
+                return repr(e)
+
+        user_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+        return {
+            user_id: error
+            for user_id, error in zip(user_ids, map_concurrent(prefetch, user_ids, concurrency))
+            if error is not None
+        }
+
+    def _promote_members(self, channel_id, manager_ids) -> list:
+        # invited users can only be promoted once they joined
+        members = {
+            str(member["id"]): member
+            for member in self.members_all(channel_id, raw=True)
+        }
+        pending = []
+
+        for user_id in manager_ids:
+            member = members.get(str(user_id))
+
+            if member is None:
+                pending.append(user_id)
+            elif not _is_manager(member):
+                self.client._post(
+                    "channels/addModeratorStatus",
+                    data={"channel_id": channel_id, "user_id": user_id},
+                )
+
+        return pending
 
     def join(self, channel_id: int | str, *, password: str | int = "") -> Channel:
         """## Joins a channel.
@@ -434,6 +1015,26 @@ class ChannelManager:
         )
         return Channel(self.client, response["channels"])
 
+    def directory(self, company_id: int | str, *, max_age: float = 300) -> ChannelDirectory:
+        """## Returns the local, searchable directory of the visible and joined channels of a company.
+
+        The directory is created once per company and kept up to date by its searches.
+
+        #### Args:
+            company_id (int | str): The companies id.
+            max_age (float, optional): Seconds after which a search refreshes first. Defaults to 300.
+
+        #### Returns:
+            ChannelDirectory: The directory.
+        """
+        directory = self._directories.get(str(company_id))
+
+        if directory is None:
+            directory = ChannelDirectory(self.client, company_id, max_age=max_age)
+            self._directories[str(company_id)] = directory
+
+        return directory
+
     def joined(self, company_id: int | str) -> Channel:
         """## Gets all joined channels.
 
@@ -1,24 +1,46 @@
-import requests
 import json
 import time
 import threading
-import socketio
 
 from .messages import MessageManager
 from .account import AccountManager
 from .users import UserManager
-from .crypto_utils import CryptoUtils
+from .crypto_utils import get_backend
 from .conversations import ConversationManager
 from .companies import CompanyManager
 from .channels import ChannelManager
 from .files import FileManager
 from .authentication import AuthManager
+from .session import SessionStore
+from .hedging import HedgePolicy, LatencyTracker
+from .dispatch import EventDispatcher
+from .routing import EventFilter, EventRouter
+from .coalescing import Coalescer
+from .catchup import CatchUp
+from .scheduler import Scheduler
+from .cache import TTLCache
+from .latency import LatencyProbe
+from .polling import PollingTransport
+from .sync import ChatSync
+from .timeouts import DEFAULT_TIMEOUTS, DeadlineExceeded, endpoint_class, endpoint_name
+from .timeouts import remaining as deadline_remaining
 
 from .tools import Tools
 from .models import Message
 
 from . import __version__
 
+# the status codes of a rejected (expired or revoked) client key
+AUTH_REJECTED_STATUS = (401, 403)
+AUTH_REJECTED_ERRORS = {
+    "auth_invalid",
+    "auth_failed",
+    "invalid_client_key",
+    "client_key_invalid",
+    "session_expired",
+    "not_logged_in",
+}
+
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
     "Accept": "application/json, text/plain, */*",
@@ -42,6 +64,21 @@ class Client:
         .image_url (str): URL to the user's profile image.
         .first_name (str): User's first name.
         .last_name (str): User's last name.
+        .lazy (bool): If the private key is only imported on the first encrypted operation.
+        .warmup_stats (list): Handshake timings of the pre-warmed connections.
+        .timeouts (dict): The request timeout (seconds) per endpoint class.
+        .latency (LatencyTracker): The recent request latencies per endpoint.
+        .hedge_policy (HedgePolicy): The hedging policy for idempotent reads (or None).
+        .dispatcher (EventDispatcher): The worker pool running the event handlers (or None).
+        .catch_up (CatchUp): Delivers the messages missed during socket outages (or None).
+        .poller (PollingTransport): The polling event source, if run with transport="polling".
+        .chats (ChatSync): The snapshot of the joined chats (call `.chats.sync()` for changes).
+        .scheduler (Scheduler): Runs the functions registered with @client.loop
+            (at most `.scheduler.max_workers` at once, 4 by default).
+        .latency_probe (LatencyProbe): Measures socket and REST round trips (or None).
+        .recorder (EventRecorder): Records the raw socket events (or None).
+        .cache (TTLCache): Caches users, companies and chat types (can be shared).
+        .crypto (CryptoUtils): The crypto backend ("pycryptodome" or "openssl").
     """
 
     def __init__(
@@ -54,6 +91,15 @@ class Client:
         encryption_password=None,
         device_id=None,
         app_name=None,
+        session_file=None,
+        session_secret=None,
+        lazy=False,
+        warm_connections=0,
+        timeouts=None,
+        hedge_policy=None,
+        http_session=None,
+        cache=None,
+        crypto_backend="pycryptodome",
     ):
 
         self.messages = MessageManager(self)
@@ -80,37 +126,172 @@ class Client:
         self._push_url = "https://push.stashcat.com/"
 
         self._headers = headers
-        self._session = requests.Session()
-        self._session.headers.update(self._headers)
-        if proxy is not None: 
-            self._session.proxies.update(proxy)
-        if cert_path is not None: 
-            self._session.verify = cert_path
 
-        self._login()
+        if http_session is not None:
+            # a shared session is configured by its owner (e.g. a ClientPool)
+            self._session = http_session
+        else:
+            self._session = Client._create_session(proxy, cert_path, warm_connections)
+
+        self.cache = TTLCache() if cache is None else cache
+        self.crypto = get_backend(crypto_backend)
+
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts is not None:
+            self.timeouts.update(timeouts)
+
+        self.latency = LatencyTracker()
+        self.hedge_policy = HedgePolicy() if hedge_policy is True else hedge_policy
 
         self.conversation_keys = {}
-        self.events = {}
+        self.events = EventRouter(self)
         self.loops = []
+        self.scheduler = Scheduler()
+        self.dispatcher = None
+        self.catch_up = None
+
+        self._private_key_value = None
+        self._private_key_loader = None
+        self._private_key_lock = threading.Lock()
+
+        self.latency_probe = None
+        self.sio = None
+        self.poller = None
+        self.chats = ChatSync(self)
+        self.recorder = None
+
+        self.warmup_stats = []
+        self._warmup_threads = []
+
+        if warm_connections > 0:
+            # runs next to login and the key import
+            self._start_warmup(warm_connections)
+
+        self.lazy = lazy
+        self._session_store = None
+        self._session_verified = True
+
+        if session_file is not None:
+            if session_secret is None:
+                raise ValueError("A session_secret is needed to use a session_file")
+            self._session_store = SessionStore(session_file, session_secret)
+
+        if not self._restore_session():
+            self._login()
+
+            if encryption_password is not None:
+                self._private_key_loader = self._fetch_private_key
+
+            self._save_session()
+
+        if not lazy:
+            # importing the key now keeps the old eager behaviour
+            self._private_key
+
+    @staticmethod
+    def _create_adapter(pool_size=10):
+        import requests
+
+        return requests.adapters.HTTPAdapter(
+            pool_connections=2, pool_maxsize=max(10, pool_size)
+        )
+
+    @staticmethod
+    def _create_session(proxy=None, cert_path=None, pool_size=10, adapter=None):
+        import requests
+
+        session = requests.Session()
+        # sessions with the same adapter share its connections, not their cookies
+        session.mount("https://", adapter or Client._create_adapter(pool_size))
+        session.headers.update(headers)
+        if proxy is not None:
+            session.proxies.update(proxy)
+        if cert_path is not None:
+            session.verify = cert_path
+
+        return session
+
+    def _start_warmup(self, connections):
+        targets = [self._main_url] * connections + [self._push_url]
+
+        for url in targets:
+            thread = threading.Thread(target=self._warm_connection, args=(url,))
+            thread.daemon = True
+            thread.start()
+            self._warmup_threads.append(thread)
+
+    def _warm_connection(self, url):
+        start_time = time.perf_counter()
+
+        try:
+            # the connection stays in the sessions keep-alive pool afterwards
+            self._session.head(url, timeout=10)
+            success = True
+        except Exception:
+            success = False
+
+        self.warmup_stats.append(
+            {
+                "url": url,
+                "handshake": round((time.perf_counter() - start_time) * 1000, 2),
+                "success": success,
+            }
+        )
+
+    def wait_warmup(self, timeout: float = None) -> list:
+        """## Waits until the pre-warmed connections are open.
+
+        #### Args:
+            timeout (float, optional): The maximum time to wait (seconds). Defaults to None.
 
-        self._private_key = None
-        self._ping_target = None
-        self._end_time = None
-        self._latency_ws = None
+        #### Returns:
+            list: The handshake timings in milliseconds per connection.
+        """
+        end_time = None if timeout is None else time.perf_counter() + timeout
+
+        for thread in self._warmup_threads:
+            if end_time is None:
+                thread.join()
+            else:
+                thread.join(max(0, end_time - time.perf_counter()))
+
+        return list(self.warmup_stats)
+
+    @property
+    def _private_key(self):
+        if self._private_key_loader is not None:
+            with self._private_key_lock:
+                loader = self._private_key_loader
+
+                if loader is not None:
+                    self._private_key_value = loader()
+                    self._private_key_loader = None
+
+                    if loader == self._fetch_private_key:
+                        self._save_session()
+
+        return self._private_key_value
+
+    @_private_key.setter
+    def _private_key(self, value):
+        self._private_key_value = value
+        self._private_key_loader = None
 
-        if encryption_password is not None:
-            self.get_private_key(encryption_password=self.encryption_password)
+    def _set_userinfo(self, client_key, userinfo):
+        self.client_key = client_key
+        self._userinfo = userinfo
+
+        self.socket_id = userinfo["socket_id"]
+        self.user_id = userinfo["id"]
+        self.image_url = userinfo["image"]
+
+        self.first_name = userinfo["first_name"]
+        self.last_name = userinfo["last_name"]
 
     def _login(self):
         response = self.auth._login(self.email, self.password, self.app_name)
 
-        self.client_key = response["client_key"]
-        self.socket_id = response["userinfo"]["socket_id"]
-        self.user_id = response["userinfo"]["id"]
-        self.image_url = response["userinfo"]["image"]
-
-        self.first_name = response["userinfo"]["first_name"]
-        self.last_name = response["userinfo"]["last_name"]
+        self._set_userinfo(response["client_key"], response["userinfo"])
 
         if self.encryption_password is None:
             print(
@@ -122,6 +303,69 @@ class Client:
 
         return response
 
+    def _restore_session(self) -> bool:
+        if self._session_store is None:
+            return False
+
+        session = self._session_store.load()
+
+        if (
+            session is None
+            or session.get("email") != self.email
+            or session.get("device_id") != self.device_id
+        ):
+            return False
+
+        self._set_userinfo(session["client_key"], session["userinfo"])
+        self._session_verified = False
+
+        if session.get("private_key") is not None:
+            private_key = session["private_key"]
+            self._private_key_loader = lambda: self.crypto.load_private_key(
+                private_key, None
+            )
+        elif self.encryption_password is not None:
+            self._private_key_loader = self._fetch_private_key
+
+        print(f"Restored session of {self.first_name} {self.last_name}!")
+        return True
+
+    def _save_session(self):
+        if self._session_store is None:
+            return
+
+        private_key = None
+        if self._private_key_value is not None:
+            private_key = self.crypto.export_private_key(self._private_key_value)
+
+        self._session_store.save(
+            {
+                "email": self.email,
+                "device_id": self.device_id,
+                "client_key": self.client_key,
+                "userinfo": self._userinfo,
+                "private_key": private_key,
+            }
+        )
+
+    def clear_session(self) -> None:
+        """## Deletes the stored session file (if one is used)."""
+        if self._session_store is not None:
+            self._session_store.clear()
+
+    def _is_rejected(self, response) -> bool:
+        if response.status_code in AUTH_REJECTED_STATUS:
+            return True
+        try:
+            status = response.json()["status"]
+        except Exception:
+            return False
+
+        # other errors (e.g. invalid parameters) do not mean the key expired
+        return status["value"] != "OK" and (
+            str(status.get("short_message", "")).lower() in AUTH_REJECTED_ERRORS
+        )
+
     def _post(self, url, *, data, auth=True, return_all=False, **kwargs):
 
         data["device_id"] = self.device_id
@@ -129,7 +373,19 @@ class Client:
         if auth is True:
             data["client_key"] = self.client_key
 
-        response = self._session.post(f"{self._main_url}{url}", data=data, **kwargs)
+        response = self._request(url, data, **kwargs)
+
+        if auth is True and not self._session_verified and response.status_code < 500:
+            # a restored session might hold an expired client key, so log in once more
+            # (server errors say nothing about the key, the next request checks again)
+            self._session_verified = True
+
+            if self._is_rejected(response):
+                self._login()
+                self._save_session()
+                return self._post(
+                    url, data=data, auth=auth, return_all=return_all, **kwargs
+                )
 
         response.raise_for_status()
 
@@ -147,16 +403,55 @@ class Client:
         else:
             return response
 
-    def get_private_key(self, *, encryption_password: str) -> None:
+    def _request(self, url, data, **kwargs):
+        import requests
+
+        timeout = kwargs.pop("timeout", self.timeouts[endpoint_class(url)])
+        limit = deadline_remaining()
+
+        if limit is not None:
+            if limit <= 0:
+                raise DeadlineExceeded(f"Deadline exceeded before requesting {url}")
+            timeout = min(timeout, limit)
 
+        endpoint = endpoint_name(url)
+
+        def send():
+            start_time = time.perf_counter()
+            response = self._session.post(
+                f"{self._main_url}{url}", data=data, timeout=timeout, **kwargs
+            )
+            self.latency.record(endpoint, time.perf_counter() - start_time)
+            return response
+
+        delay = None
+        if self.hedge_policy is not None and endpoint in self.hedge_policy.endpoints:
+            delay = self.hedge_policy.threshold(self.latency, endpoint)
+
+        try:
+            if delay is not None and delay < timeout:
+                return self.hedge_policy.run(send, delay)
+            return send()
+        except requests.Timeout as e:
+            if limit is not None and limit <= timeout:
+                raise DeadlineExceeded(f"Deadline exceeded requesting {url}") from e
+            raise
+
+    def _fetch_private_key(self):
         print("Importing private key. Please wait...")
         response = self._post("security/get_private_key", data={})
         encrypted_key = json.loads(response["keys"]["private_key"])
 
-        self._private_key = CryptoUtils.load_private_key(
-            encrypted_key["private"], encryption_password
+        return self.crypto.load_private_key(
+            encrypted_key["private"], self.encryption_password
         )
 
+    def get_private_key(self, *, encryption_password: str) -> None:
+
+        self.encryption_password = encryption_password
+        self._private_key = self._fetch_private_key()
+        self._save_session()
+
     def get_conversation_key(self, target, target_type, key=None):
 
         if self._private_key is None:
@@ -180,126 +475,331 @@ class Client:
                     )
                     encrypted_key = response["channels"]["key"]
 
-            decrypted_key = CryptoUtils.decrypt_key(encrypted_key, self._private_key)
+            decrypted_key = self.crypto.decrypt_key(encrypted_key, self._private_key)
 
             self.conversation_keys[target] = decrypted_key
             return self.conversation_keys[target]
 
-    def event(self, name):
+    def event(
+        self,
+        name,
+        *,
+        channels=None,
+        conversations=None,
+        senders=None,
+        kinds=None,
+        ignore_own=False,
+        debounce=None,
+        throttle=None,
+        key=None,
+        batch=False,
+        max_wait=None,
+    ):
+        """## Registers a handler for a socket event.
+
+        The filters are checked on the raw payload, so ignored messages are
+        never decrypted. An event can have several handlers.
+
+        With debounce or throttle the events are coalesced (see Coalescer) and
+        the handler receives the latest event or, with batch, a list.
+
+        #### Args:
+            name (str): The event name.
+            channels (str | int | list, optional): Only these channels. Defaults to None.
+            conversations (str | int | list, optional): Only these conversations. Defaults to None.
+            senders (str | int | list, optional): Only these sender ids. Defaults to None.
+            kinds (str | list, optional): Only these message kinds. Defaults to None.
+            ignore_own (bool, optional): Skip events caused by this client. Defaults to False.
+            debounce (float, optional): Run once no event came for this many seconds.
+            throttle (float, optional): Run at most once per this many seconds.
+            key (callable, optional): Keep only the latest event per key(event).
+            batch (bool, optional): Pass a list of the collected events. Defaults to False.
+            max_wait (float, optional): Run a debounced handler at the latest this many
+                seconds after the first event. Defaults to 10 times debounce.
+        """
 
         def decorator(func):
-            def wrapper(*args):
-
-                if func.__name__ == "message_received":
-                    func(Message(self, args[0]["message"]))
-
-                else:
-                    if len(args) == 1:
-                        func(args[0])
-                    else:
-                        func(args)
-
-            self.events[name] = wrapper
-            return wrapper
+            event_filter = EventFilter(
+                self,
+                channels=channels,
+                conversations=conversations,
+                senders=senders,
+                kinds=kinds,
+                ignore_own=ignore_own,
+            )
+            handler = func
+            if debounce is not None or throttle is not None:
+                handler = Coalescer(
+                    func,
+                    debounce=debounce,
+                    throttle=throttle,
+                    key=key,
+                    batch=batch,
+                    max_wait=max_wait,
+                )
+
+            self.events.add(name, handler, event_filter)
+            return func
 
         return decorator
 
-    def loop(self, seconds):
-        def decorator(func):
-            def wrapped_func():
-                def run():
-                    time.sleep(2)
-                    while True:
-                        func()
-                        time.sleep(seconds)
-
-                return run
+    def loop(
+        self,
+        seconds=None,
+        *,
+        cron=None,
+        mode="fixed_rate",
+        jitter=0,
+        overlap="skip",
+        delay=2,
+    ):
+        """## Runs a function periodically once the client is running.
+
+        All loops share one scheduler thread. Exceptions are printed and
+        counted but never stop the loop. The job is stored as `func.job`
+        (use `func.job.cancel()` to stop it).
+
+        #### Args:
+            seconds (float, optional): The interval in seconds. Defaults to None.
+            cron (str, optional): A cron expression instead of an interval. Defaults to None.
+            mode (str, optional): "fixed_rate" (no drift) or "fixed_delay" (pause between
+                runs). Defaults to "fixed_rate".
+            jitter (float, optional): Maximum random delay per run (seconds). Defaults to 0.
+            overlap (str, optional): "skip", "queue" or "allow" if the last run is still
+                running. Defaults to "skip".
+            delay (float, optional): Delay before the first run (seconds). Defaults to 2.
+        """
 
-            self.loops.append(wrapped_func())
+        def decorator(func):
+            func.job = self.scheduler.add(
+                func,
+                interval=seconds,
+                cron=cron,
+                mode=mode,
+                jitter=jitter,
+                overlap=overlap,
+                delay=delay,
+            )
+            self.loops.append(func.job)
             return func
 
         return decorator
 
-    def event_modifier(self):
-        def decorator(func):
-            def wrapper(*args):
-                if str(args[2]) == str(self.user_id) and str(args[1]) == str(
-                    self._ping_target
-                ):
-                    self._end_time = time.perf_counter()
-                func(*args)
+    def _run(self, debug=False, sio=None):
+        if sio is None:
+            import socketio
+
+            # share the http session so the push handshake can use a warm connection
+            # reconnects use an exponential backoff of 1s up to 30s
+            sio = socketio.Client(
+                logger=debug,
+                engineio_logger=debug,
+                http_session=self._session,
+                reconnection=True,
+                reconnection_attempts=0,
+                reconnection_delay=1,
+                reconnection_delay_max=30,
+            )
 
-            return wrapper
+        self.sio = sio
 
-        return decorator
+        @self.sio.event
+        def connect():
+            print("Connected to the server.")
+            self.sio.emit("userid", self._socket_auth())
+            self._on_connected()
 
-    def _run(self, debug=False):
+        @self.sio.event
+        def disconnect(*args):
+            # socketio reconnects on its own unless the client disconnected
+            print("Disconnected from the server")
 
-        self.sio = socketio.Client(logger=debug, engineio_logger=debug)
+        for event_name in self._socket_event_names():
+            self.sio.on(event_name)(self._socket_event(event_name))
 
-        @self.sio.event
-        def connect():
+        if self.dispatcher is not None:
+            self.dispatcher.start()
 
-            print("Connected to the server.")
+        try:
+            self.sio.connect(self._push_url, retry=True)
+            self.sio.wait()
+        finally:
+            if self.dispatcher is not None:
+                self.dispatcher.stop()
 
-            data = {
-                "hidden_id": self.socket_id,
-                "device_id": self.device_id,
-                "client_key": self.client_key,
-            }
+    def _run_polling(self, chats=None):
+        self.poller = PollingTransport(self, chats)
+        for chat in self.events.chats():
+            self.poller.add(chat)
 
-            self.sio.emit("userid", data)
+        if self.dispatcher is not None:
+            self.dispatcher.start()
 
-        @self.sio.event
-        def disconnect():
-            print("Disconnected from the server")
-            self.sio.disconnect()
+        try:
+            self.poller.run(self._deliver_event)
+        finally:
+            if self.dispatcher is not None:
+                self.dispatcher.stop()
+
+    def _socket_auth(self):
+        return {
+            "hidden_id": self.socket_id,
+            "device_id": self.device_id,
+            "client_key": self.client_key,
+        }
+
+    def _on_connected(self):
+        if self.catch_up is not None:
+            self.catch_up.connected(self._deliver_event)
+
+    def _socket_event_names(self):
+        return set(self.events.names())
+
+    def _socket_event(self, event_name):
+        def handler(*args):
+            if self.recorder is not None:
+                self.recorder.event(event_name, args)
+
+            if self.catch_up is not None:
+                # live events wait until missed messages are delivered
+                if self.catch_up.hold(event_name, args):
+                    return
+                if not self.catch_up.observe(event_name, args):
+                    return
+
+            self._deliver_event(event_name, args)
+
+        return handler
+
+    def _deliver_event(self, event_name, args):
+        if self.dispatcher is None:
+            self.events.dispatch(event_name, args)
+
+        # irrelevant events never reach the queue
+        elif self.events.matches(event_name, args):
+            self.dispatcher.submit(event_name, args, self.events.dispatch)
+
+    def run(
+        self,
+        debug=False,
+        *,
+        workers=0,
+        queue_size=1000,
+        overflow="block",
+        catch_up=True,
+        catch_up_limit=50,
+        transport="socket",
+        poll_chats=None,
+    ):
+        """## Starts the loops and listens for events.
+
+        #### Args:
+            debug (bool, optional): Log the socket traffic. Defaults to False.
+            workers (int, optional): Worker threads for the event handlers. Defaults to 0
+                (handlers run on the socket thread).
+            queue_size (int, optional): The queue bound per worker. Defaults to 1000.
+            overflow (str, optional): "block", "drop_oldest" or "spill" (keep the overflow in
+                an unbounded deque) when a queue is full. Defaults to "block".
+            catch_up (bool, optional): Deliver messages missed while reconnecting. Defaults to True.
+            catch_up_limit (int, optional): Missed messages fetched per request. Defaults to 50.
+            transport (str, optional): "socket" or "polling" (for networks that block websockets).
+                Defaults to "socket".
+            poll_chats (list, optional): Chats polled in addition to the joined chats and
+                those named in the handler filters. Defaults to None.
+        """
+        if transport not in ("socket", "polling"):
+            raise ValueError('transport must be "socket" or "polling"')
 
-        for event_name, event_handler in self.events.items():
-            if event_name == "user-started-typing":
-                event_modifier = self.event_modifier()(event_handler)
-                self.sio.on(event_name)(event_modifier)
-            else:
-                self.sio.on(event_name)(event_handler)
+        if catch_up and transport == "socket":
+            self.catch_up = CatchUp(self, limit=catch_up_limit)
 
-        self.sio.connect(self._push_url)
-        self.sio.wait()
+        if workers > 0:
+            self.dispatcher = EventDispatcher(
+                None, workers=workers, queue_size=queue_size, overflow=overflow
+            )
 
-    def run(self, debug=False):
         self._run_loops()
-        if len(self.events) != 0:
+        if len(self.events) != 0 and transport == "polling":
+            self._run_polling(poll_chats)
+        elif len(self.events) != 0:
             self._run(debug=debug)
+        elif len(self.loops) != 0:
+            self.scheduler.join()
 
     def _run_loops(self):
-        for loop in self.loops:
-            thread = threading.Thread(target=loop)
-            thread.start()
+        if len(self.loops) != 0:
+            self.scheduler.start()
 
-    def ws_latency(self, target):
-        """Gets the websockets latency (currently broken).
+    def start_latency_probe(
+        self,
+        ack_event=None,
+        *,
+        ack_data=None,
+        interval=10,
+        rest_endpoint="notifications/count",
+        on_sample=None,
+    ):
+        """## Starts measuring the socket and REST latency in the background.
+
+        #### Args:
+            ack_event (str, optional): A socket event the server acknowledges, timed as
+                the socket round trip. Defaults to None (REST only).
+            ack_data (optional): The data sent with the ack event. Defaults to None.
+            interval (float, optional): Seconds between probes. Defaults to 10.
+            rest_endpoint (str, optional): The endpoint used for REST probes. Defaults to
+                "notifications/count".
+            on_sample (callable, optional): Called with (kind, milliseconds) per sample.
+
+        #### Returns:
+            LatencyProbe: The running probe.
+        """
+        if self.latency_probe is not None:
+            self.latency_probe.stop()
+
+        self.latency_probe = LatencyProbe(
+            self,
+            ack_event,
+            ack_data=ack_data,
+            interval=interval,
+            rest_endpoint=rest_endpoint,
+            on_sample=on_sample,
+        )
+        self.latency_probe.start()
+        return self.latency_probe
 
-        Args:
-            target (int|str): A conversation to use. (Use the messages destination chat)
+    def latency_stats(self) -> dict:
+        """## Returns the rolling latency statistics without blocking.
 
-        Returns:
-            int: The websockets latency.
-            str: Error.
+        #### Returns:
+            dict: count, p50, p95, p99 and last (milliseconds) for "ws" and "rest".
         """
-        target_type = self.tools.get_type(target)
+        if self.latency_probe is None:
+            return {}
+        return self.latency_probe.stats()
 
-        start_time = time.perf_counter()
-        self._end_time = None
-        self._ping_target = target
+    def ws_latency(self, target=None, *, ack_event=None):
+        """## Gets the last measured websocket latency without blocking.
 
-        self.sio.emit(
-            "started-typing", (self.device_id, self.client_key, target_type, target)
-        )
+        Starts a latency probe if none is running, or asks the running probe
+        to measure again. Its result shows up in a later call. The socket is
+        only measured with an ack_event (see start_latency_probe).
+
+        #### Args:
+            target (int | str, optional): Not used anymore; nothing is sent to a chat.
+            ack_event (str, optional): A socket event the server acknowledges. Defaults to
+                the event of the running probe.
 
-        time.sleep(2)
+        #### Returns:
+            float: The websocket latency in milliseconds.
+            str: "-" if nothing was measured yet.
+        """
+        if self.latency_probe is None:
+            self.start_latency_probe(ack_event)
 
-        if self._end_time is None:
-            self._latency_ws = None
-            return "-"
         else:
-            self._latency_ws = (round((self._end_time - start_time) * 100000)) / 100
-            return self._latency_ws
+            if ack_event is not None:
+                self.latency_probe.ack_event = ack_event
+            self.latency_probe.request()
+
+        latency = self.latency_probe.last["ws"]
+        return "-" if latency is None else latency
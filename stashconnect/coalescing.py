@@ -0,0 +1,137 @@
+import functools
+import threading
+import time
+
+
+class Coalescer:
+    """## Collects high frequency events and hands them to a handler in bulk.
+
+    With `debounce` the handler runs once no event arrived for that many
+    seconds, but at the latest `max_wait` seconds after the first collected
+    event, so a storm cannot postpone it forever. With `throttle` it runs at
+    most once per period. Both call the
+    handler from one timer thread per Coalescer, never from the socket thread;
+    new events only move its deadline, so an event storm starts no threads.
+
+    The handler receives the latest event, or a list of events with
+    `batch=True`. Without `batch` and `key` only the latest event is kept.
+    With a `key` function only the latest event per key is kept (last value
+    wins), and without `batch` the handler runs once per key.
+
+    #### Attributes:
+        .debounce (float): The quiet period in seconds (or None).
+        .max_wait (float): The longest a debounced event waits in seconds (or None).
+        .throttle (float): The minimum period between calls in seconds (or None).
+        .key (callable): Maps an event to its key (or None).
+        .batch (bool): If the handler receives a list.
+        .received (int): The amount of received events.
+        .flushed (int): The amount of handler calls.
+    """
+
+    def __init__(
+        self,
+        func,
+        *,
+        debounce: float = None,
+        throttle: float = None,
+        key=None,
+        batch: bool = False,
+        max_wait: float = None,
+    ):
+        if (debounce is None) == (throttle is None):
+            raise ValueError("Set either debounce or throttle")
+        if debounce is not None and max_wait is None:
+            max_wait = debounce * 10
+
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.debounce = debounce
+        self.throttle = throttle
+        self.max_wait = max_wait
+        self.key = key
+        self.batch = batch
+
+        self.received = 0
+        self.flushed = 0
+
+        self._events = {} if key is not None else []
+        self._deadline = None
+        self._first = None
+        self._thread = None
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+
+    def __call__(self, value) -> None:
+        with self._lock:
+            self.received += 1
+
+            if self.key is not None:
+                key = self.key(value)
+                # re-insert so the dict keeps the order of the latest updates
+                self._events.pop(key, None)
+                self._events[key] = value
+            elif self.batch:
+                self._events.append(value)
+            else:
+                # only the latest event is handed over
+                self._events = [value]
+
+            now = time.monotonic()
+            if self._first is None:
+                self._first = now
+
+            if self.debounce is not None:
+                self._deadline = now + self.debounce
+                if self.max_wait is not None:
+                    self._deadline = min(self._deadline, self._first + self.max_wait)
+            elif self._deadline is None:
+                self._deadline = max(now, self._last_flush + self.throttle)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="stashconnect-coalescer", daemon=True
+                )
+                self._thread.start()
+
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                # the deadline can move while waiting, so check it again after every wake up
+                while self._deadline is None or self._deadline > time.monotonic():
+                    if self._deadline is None:
+                        self._condition.wait()
+                    else:
+                        self._condition.wait(self._deadline - time.monotonic())
+
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error in coalesced handler '{self.__name__}': {e!r}")
+
+    def flush(self) -> None:
+        """## Hands the collected events to the handler now."""
+        with self._lock:
+            events = self._events
+            self._events = {} if self.key is not None else []
+            self._deadline = None
+            self._first = None
+            self._last_flush = time.monotonic()
+
+        if not events:
+            return
+
+        if self.key is not None:
+            events = list(events.values())
+
+        self.flushed += 1
+
+        if self.batch:
+            self.func(events)
+        elif self.key is not None:
+            for event in events:
+                self.func(event)
+        else:
+            self.func(events[-1])
@@ -5,6 +5,24 @@ class CompanyManager:
     def __init__(self, client) -> None:
         self.client = client
 
+    def _details(self, company_id: str | int) -> dict:
+        """## Gets the details of a company as a dict (cached).
+
+        #### Args:
+            company_id (str | int): The companies id.
+
+        #### Returns:
+            dict: The company details.
+        """
+        # the details contain the accounts roles, so they are cached per account
+        return self.client.cache.get_or_set(
+            ("company", str(self.client.user_id), str(company_id)),
+            lambda: self.client._post(
+                "company/details", data={"company_id": company_id}
+            )["company"],
+            copy=True,
+        )
+
     def info(self, company_id: str | int) -> Company:
         """## Gets the info of a company.
 
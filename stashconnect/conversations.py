@@ -1,20 +1,8 @@
-import Crypto
-import Crypto.Cipher
-import Crypto.Cipher.PKCS1_OAEP
-import Crypto.Hash
-import Crypto.Hash.SHA256
-import Crypto.PublicKey
-import Crypto.PublicKey.RSA
-import Crypto.Random
-import Crypto.SelfTest
-import Crypto.Signature
-import Crypto.Signature.pkcs1_15
-import Crypto.Util
-
-import base64
 import json
+from typing import Generator
 
 from .models import Conversation
+from .timeouts import with_deadline
 
 
 class ConversationManager:
@@ -100,21 +88,24 @@ class ConversationManager:
             data={"type": "conversation", "content_id": conversation_id},
         )
 
+    @with_deadline
     def create(self, members: str | int | list) -> Conversation:
         """## Creates a conversation with users.
 
         #### Args:
             members (str | int | list): The members of the conversation.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             Conversation: A conversation object.
         """
-        conversation_key = Crypto.Random.get_random_bytes(32)
+        conversation_key = self.client.crypto.random_bytes(32)
         users = []
 
         # encrypt conversation key using private key
-        encryptor = Crypto.Cipher.PKCS1_OAEP.new(self.client._private_key.publickey())
-        encrypted_key = encryptor.encrypt(conversation_key)
+        encrypted_key = self.client.crypto.encrypt_key(
+            conversation_key, self.client.crypto.public_key(self.client._private_key)
+        )
 
         # i dont know where the private signing key is located
         # if you know where it is please tell me :)
@@ -126,7 +117,7 @@ class ConversationManager:
         users.append(
             {
                 "id": int(self.client.user_id),
-                "key": base64.b64encode(encrypted_key).decode("utf-8"),
+                "key": encrypted_key,
                 # "signature": encoded_signature,
                 # "userVerified": True,
             }
@@ -136,14 +127,12 @@ class ConversationManager:
             members = [members]
 
         # encrypt conversation key using public key for all members
-        for member in members:
-            user = self.client.users._info(member)
-
-            publickey = Crypto.PublicKey.RSA.import_key(user["public_key"])
-
-            encryptor = Crypto.Cipher.PKCS1_OAEP.new(publickey)
-            encrypted_key = encryptor.encrypt(conversation_key)
+        public_keys = self.client.users.public_keys(members)
+        encrypted_keys = self.client.crypto.encrypt_key_many(
+            conversation_key, [key for _, key in public_keys.values()], workers=4
+        )
 
+        for (user, _), encrypted_key in zip(public_keys.values(), encrypted_keys):
             # hash = Crypto.Hash.SHA256.new(encrypted_key)
             # signature = Crypto.Signature.pkcs1_15.new(self.client._private_key).sign(hash)
             # encoded_signature = base64.b64encode(signature).decode("utf-8")
@@ -151,7 +140,7 @@ class ConversationManager:
             users.append(
                 {
                     "id": int(user["id"]),
-                    "key": base64.b64encode(encrypted_key).decode("utf-8"),
+                    "key": encrypted_key,
                     # "signature": encoded_signature,
                     # "expiry": int(round(time.time())),
                     # "userVerified": True,
@@ -165,11 +154,13 @@ class ConversationManager:
 
         return Conversation(self.client, response["conversation"])
 
+    @with_deadline
     def info(self, conversation_id: str | int) -> Conversation:
         """## Fetches the info of a conversation.
 
         #### Args:
             conversation_id (str | int): The conversations info.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             Conversation: A conversation object.
@@ -178,3 +169,52 @@ class ConversationManager:
             "message/conversation", data={"conversation_id": conversation_id}
         )
         return Conversation(self.client, response["conversation"])
+
+    def _page(self, limit: int, offset: int, archived: bool = False) -> list:
+        response = self.client._post(
+            "message/conversations",
+            data={"limit": limit, "offset": offset, "archive": int(archived)},
+        )
+        return response["conversations"]
+
+    @with_deadline
+    def list(
+        self,
+        *,
+        archived: bool = False,
+        raw: bool = False,
+        page_size: int = 50,
+        limit: int = None,
+    ) -> Generator[Conversation | dict, None, None]:
+        """## Lists the conversations, most recently active first.
+
+        The pages are requested while iterating. The Conversation objects
+        resolve their members and key lazily, so listing costs one request
+        per page.
+
+        #### Args:
+            archived (bool, optional): List the archived conversations. Defaults to False.
+            raw (bool, optional): Yield the conversation dicts instead of objects. Defaults to False.
+            page_size (int, optional): The conversations per request. Defaults to 50.
+            limit (int, optional): The maximum amount of conversations. Defaults to None (all).
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
+
+        #### Yields:
+            Generator[Conversation | dict, None, None]: Every conversation once.
+        """
+        seen = set()
+        offset = 0
+
+        while limit is None or len(seen) < limit:
+            size = page_size if limit is None else min(page_size, limit - len(seen))
+            page = self._page(size, offset, archived)
+            offset += len(page)
+
+            for conversation in page:
+                # a conversation that became active while paging moves to the front
+                if str(conversation["id"]) not in seen:
+                    seen.add(str(conversation["id"]))
+                    yield conversation if raw else Conversation(self.client, conversation)
+
+            if len(page) < size:
+                return
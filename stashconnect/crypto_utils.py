@@ -1,20 +1,144 @@
-import Crypto.Cipher
-import Crypto.Cipher.AES
-import Crypto.Cipher.PKCS1_OAEP
-import Crypto.Protocol
-import Crypto.PublicKey
-import Crypto.PublicKey.RSA
-import Crypto
-
-import Crypto.Random
-import Crypto.Util
-import Crypto.Util.Padding
-
 import base64
 
 
+class AESEncryptor:
+    """## Encrypts a stream with AES-CBC and PKCS#7 padding.
+
+    `update` takes chunks of any size (bytes, bytearray or memoryview) and
+    returns the ciphertext of all complete blocks, `finalize` the padded last
+    block. Create it with `client.crypto.aes_encryptor(key, iv)`.
+    """
+
+    _hold_back = False
+
+    def __init__(self, process):
+        self._process = process
+        self._pending = bytearray()
+        self._finalized = False
+
+    def _split(self, data):
+        # returns the complete blocks as (head, body), keeping the rest pending
+        if self._finalized:
+            raise ValueError("The cipher was already finalized")
+
+        data = memoryview(data).cast("B")
+        total = len(self._pending) + len(data)
+        usable = total - total % 16
+
+        if self._hold_back and usable == total:
+            # the last block might hold the padding
+            usable -= 16
+
+        if usable <= 0:
+            self._pending += data
+            return None, data[:0]
+
+        head = None
+        if self._pending:
+            fill = 16 - len(self._pending)
+            head = bytes(self._pending) + data[:fill].tobytes()
+            data = data[fill:]
+            usable -= 16
+
+        body = data[:usable]
+        self._pending = bytearray(data[usable:])
+        return head, body
+
+    def update(self, data) -> bytes:
+        """## Processes a chunk.
+
+        #### Args:
+            data (bytes | bytearray | memoryview): The next chunk.
+
+        #### Returns:
+            bytes: The output of all complete blocks.
+        """
+        head, body = self._split(data)
+
+        output = b"" if head is None else self._process(head)
+        if len(body):
+            output += self._process(body)
+        return output
+
+    def update_into(self, data, buffer) -> int:
+        """## Processes a chunk into a preallocated buffer.
+
+        #### Args:
+            data (bytes | bytearray | memoryview): The next chunk.
+            buffer (bytearray | memoryview): Receives the output, needs len(data) + 16 bytes.
+
+        #### Returns:
+            int: The amount of bytes written to the buffer.
+        """
+        buffer = memoryview(buffer).cast("B")
+        if len(buffer) < len(data) + 16:
+            raise ValueError("The buffer needs at least len(data) + 16 bytes")
+
+        head, body = self._split(data)
+        written = 0
+
+        if head is not None:
+            self._process(head, buffer[:16])
+            written = 16
+        if len(body):
+            self._process(body, buffer[written : written + len(body)])
+            written += len(body)
+
+        return written
+
+    def finalize(self) -> bytes:
+        """## Pads and processes the last block.
+
+        #### Returns:
+            bytes: The last block.
+        """
+        padding = 16 - len(self._pending)
+        last = bytes(self._pending) + bytes([padding]) * padding
+
+        self._finalized = True
+        self._pending = bytearray()
+        return self._process(last)
+
+
+class AESDecryptor(AESEncryptor):
+    """## Decrypts an AES-CBC stream and removes the PKCS#7 padding.
+
+    Works like AESEncryptor, the last block is held back until `finalize`.
+    Create it with `client.crypto.aes_decryptor(key, iv)`.
+    """
+
+    _hold_back = True
+
+    def finalize(self) -> bytes:
+        """## Processes the last block and removes the padding.
+
+        #### Returns:
+            bytes: The plaintext of the last block.
+        """
+        if len(self._pending) != 16:
+            raise ValueError("The encrypted data is not a multiple of the block size")
+
+        last = self._process(bytes(self._pending))
+        self._finalized = True
+        self._pending = bytearray()
+
+        padding = last[-1]
+        if not 1 <= padding <= 16 or last[-padding:] != bytes([padding]) * padding:
+            raise ValueError("Padding is incorrect.")
+
+        return last[:-padding]
+
+
 class CryptoUtils:
+    """## The crypto backend using pycryptodome (the default).
+
+    Every backend offers the same functions, and its key objects are only
+    used with the backend that created them.
+    """
+
+    name = "pycryptodome"
 
+    @staticmethod
     def encrypt_aes(plain: bytes, key: bytes, iv: bytes) -> bytes:
         """## Encrypts the provided plaintext using AES.
 
@@ -26,10 +150,14 @@ class CryptoUtils:
         #### Returns:
             bytes: The encrypted data as bytes.
         """
+        import Crypto.Cipher.AES
+        import Crypto.Util.Padding
+
         padded = Crypto.Util.Padding.pad(plain, Crypto.Cipher.AES.block_size)
         encryptor = Crypto.Cipher.AES.new(key, Crypto.Cipher.AES.MODE_CBC, iv=iv)
         return encryptor.encrypt(padded)
 
+    @staticmethod
     def decrypt_aes(encrypted: bytes, key: bytes, iv: bytes) -> bytes:
         """## Decrypts the provided data using AES.
 
@@ -41,10 +169,158 @@ class CryptoUtils:
         #### Returns:
             bytes: The decoded plaintext data.
         """
+        import Crypto.Cipher.AES
+        import Crypto.Util.Padding
+
         decryptor = Crypto.Cipher.AES.new(key, Crypto.Cipher.AES.MODE_CBC, iv=iv)
         decrypted = decryptor.decrypt(encrypted)
         return Crypto.Util.Padding.unpad(decrypted, Crypto.Cipher.AES.block_size)
 
+    @classmethod
+    def encrypt_many(cls, items: list, key: bytes, *, workers: int = 0) -> list:
+        """## Encrypts several plaintexts with one key using AES.
+
+        #### Args:
+            items (list): (plain, iv) pairs, plain as bytes or str.
+            key (bytes): The key used for AES encryption.
+            workers (int, optional): Threads used for large batches. Defaults to 0.
+
+        #### Returns:
+            list: The encrypted data of every item as bytes.
+        """
+
+        def encrypt(item):
+            plain, iv = item
+            if isinstance(plain, str):
+                plain = plain.encode("utf-8")
+            return cls.encrypt_aes(plain, key, iv)
+
+        return cls._map(encrypt, items, workers)
+
+    @classmethod
+    def decrypt_many(
+        cls,
+        items: list, key: bytes, *, workers: int = 0, chunk_size: int = 256
+    ) -> list:
+        """## Decrypts several AES encrypted items with one key.
+
+        All ciphertexts of a chunk are decrypted in one call and then chained
+        like CBC does, so the cipher is only set up once per chunk.
+
+        #### Args:
+            items (list): (encrypted, iv) pairs as bytes or hex strings.
+            key (bytes): The key used for AES decryption.
+            workers (int, optional): Threads used for batches larger than one chunk. Defaults to 0.
+            chunk_size (int, optional): The amount of items per chunk. Defaults to 256.
+
+        #### Returns:
+            list: The plaintext of every item as bytes, or None if it could not be decrypted.
+        """
+
+        def prepare(item):
+            encrypted, iv = item
+            try:
+                if isinstance(encrypted, str):
+                    encrypted = bytes.fromhex(encrypted)
+                if isinstance(iv, str):
+                    iv = bytes.fromhex(iv)
+            except (TypeError, ValueError):
+                return None
+
+            if not encrypted or len(encrypted) % 16 or len(iv) != 16:
+                return None
+            return encrypted, iv
+
+        def decrypt(chunk):
+            chunk = [prepare(item) for item in chunk]
+            valid = [item for item in chunk if item is not None]
+            if not valid:
+                return chunk
+
+            # CBC: plain block i = D(cipher block i) XOR cipher block i-1 (the iv for i=0)
+            blocks = cls._decrypt_blocks(b"".join(encrypted for encrypted, _ in valid), key)
+
+            plains = []
+            offset = 0
+
+            for item in chunk:
+                if item is None:
+                    plains.append(None)
+                    continue
+
+                encrypted, iv = item
+                size = len(encrypted)
+                decrypted = blocks[offset : offset + size]
+                offset += size
+
+                chained = iv + encrypted[:-16]
+                plain = (
+                    int.from_bytes(decrypted, "big") ^ int.from_bytes(chained, "big")
+                ).to_bytes(size, "big")
+
+                padding = plain[-1]
+                if not 1 <= padding <= 16 or plain[-padding:] != bytes([padding]) * padding:
+                    plains.append(None)
+                else:
+                    plains.append(plain[:-padding])
+
+            return plains
+
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        return [plain for plains in cls._map(decrypt, chunks, workers) for plain in plains]
+
+    @staticmethod
+    def _decrypt_blocks(data: bytes, key: bytes) -> bytes:
+        import Crypto.Cipher.AES
+
+        return Crypto.Cipher.AES.new(key, Crypto.Cipher.AES.MODE_ECB).decrypt(data)
+
+    @classmethod
+    def aes_encryptor(cls, key: bytes, iv: bytes) -> AESEncryptor:
+        """## Creates a streaming AES-CBC encryptor.
+
+        #### Args:
+            key (bytes): The key used for AES encryption.
+            iv (bytes): The iv used for AES encryption. (16 bytes)
+
+        #### Returns:
+            AESEncryptor: The encryptor.
+        """
+        return AESEncryptor(cls._cbc(key, iv, decrypt=False))
+
+    @classmethod
+    def aes_decryptor(cls, key: bytes, iv: bytes) -> AESDecryptor:
+        """## Creates a streaming AES-CBC decryptor.
+
+        #### Args:
+            key (bytes): The key used for AES decryption.
+            iv (bytes): The iv used for AES decryption. (16 bytes)
+
+        #### Returns:
+            AESDecryptor: The decryptor.
+        """
+        return AESDecryptor(cls._cbc(key, iv, decrypt=True))
+
+    @staticmethod
+    def _cbc(key: bytes, iv: bytes, decrypt: bool):
+        # returns process(blocks, output=None), chaining across calls
+        import Crypto.Cipher.AES
+
+        cipher = Crypto.Cipher.AES.new(key, Crypto.Cipher.AES.MODE_CBC, iv=iv)
+        return cipher.decrypt if decrypt else cipher.encrypt
+
+    @staticmethod
+    def _map(func, items: list, workers: int) -> list:
+        # both backends release the GIL, so large batches can use several threads
+        if workers > 1 and len(items) > 1:
+            import concurrent.futures
+
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                return list(executor.map(func, items))
+
+        return [func(item) for item in items]
+
+    @staticmethod
     def decrypt_key(encrypted_key: bytes, private_key: bytes) -> bytes:
         """## Decrypts an RSA-encrypted key.
 
@@ -55,9 +331,12 @@ class CryptoUtils:
         #### Returns:
             bytes: The decrypted key as plaintext data.
         """
+        import Crypto.Cipher.PKCS1_OAEP
+
         decryptor = Crypto.Cipher.PKCS1_OAEP.new(private_key)
         return decryptor.decrypt(base64.b64decode(encrypted_key))
 
+    @staticmethod
     def load_private_key(encrypted_key: bytes, encryption_password: str):
         """## Imports an RSA private key using a passphrase.
 
@@ -68,7 +347,234 @@ class CryptoUtils:
         #### Returns:
             The decrypted RSA private key object.
         """
+        import Crypto.PublicKey.RSA
+
         private_key = Crypto.PublicKey.RSA.import_key(
             encrypted_key, passphrase=encryption_password
         )
         return private_key
+
+    @staticmethod
+    def export_private_key(private_key) -> str:
+        """## Exports an RSA private key without a passphrase.
+
+        #### Args:
+            private_key: The RSA private key object.
+
+        #### Returns:
+            str: The private key as an unencrypted PEM string.
+        """
+        return private_key.export_key(format="PEM").decode("utf-8")
+
+    @staticmethod
+    def load_public_key(public_key: str):
+        """## Imports an RSA public key.
+
+        #### Args:
+            public_key (str): The PEM encoded public key.
+
+        #### Returns:
+            The RSA public key object.
+        """
+        import Crypto.PublicKey.RSA
+
+        return Crypto.PublicKey.RSA.import_key(public_key)
+
+    @staticmethod
+    def encrypt_key(key: bytes, public_key) -> str:
+        """## Encrypts a key for a RSA public key.
+
+        #### Args:
+            key (bytes): The plain key (e.g. a conversation key).
+            public_key: The RSA public key object used for encryption.
+
+        #### Returns:
+            str: The encrypted key encoded as base64.
+        """
+        import Crypto.Cipher.PKCS1_OAEP
+
+        encryptor = Crypto.Cipher.PKCS1_OAEP.new(public_key)
+        return base64.b64encode(encryptor.encrypt(key)).decode("utf-8")
+
+    @classmethod
+    def encrypt_key_many(cls, key: bytes, public_keys: list, *, workers: int = 0) -> list:
+        """## Encrypts a key for several RSA public keys.
+
+        #### Args:
+            key (bytes): The plain key (e.g. a conversation key).
+            public_keys (list): The RSA public key objects.
+            workers (int, optional): Threads used for the encryption. Defaults to 0.
+
+        #### Returns:
+            list: The encrypted keys encoded as base64.
+        """
+        return cls._map(
+            lambda public_key: cls.encrypt_key(key, public_key), public_keys, workers
+        )
+
+    @staticmethod
+    def public_key(private_key):
+        """## Returns the public key of a RSA private key.
+
+        #### Args:
+            private_key: The RSA private key object.
+
+        #### Returns:
+            The RSA public key object.
+        """
+        return private_key.publickey()
+
+    @staticmethod
+    def random_bytes(length: int) -> bytes:
+        """## Generates cryptographically secure random bytes.
+
+        #### Args:
+            length (int): The amount of bytes.
+
+        #### Returns:
+            bytes: The random bytes.
+        """
+        import Crypto.Random
+
+        return Crypto.Random.get_random_bytes(length)
+
+
+class OpenSSLCrypto(CryptoUtils):
+    """## The crypto backend using OpenSSL through the cryptography package."""
+
+    name = "openssl"
+
+    @staticmethod
+    def encrypt_aes(plain: bytes, key: bytes, iv: bytes) -> bytes:
+        from cryptography.hazmat.primitives import padding
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        padder = padding.PKCS7(128).padder()
+        padded = padder.update(plain) + padder.finalize()
+
+        encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
+        return encryptor.update(padded) + encryptor.finalize()
+
+    @staticmethod
+    def decrypt_aes(encrypted: bytes, key: bytes, iv: bytes) -> bytes:
+        from cryptography.hazmat.primitives import padding
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+        decrypted = decryptor.update(encrypted) + decryptor.finalize()
+
+        unpadder = padding.PKCS7(128).unpadder()
+        return unpadder.update(decrypted) + unpadder.finalize()
+
+    @staticmethod
+    def _decrypt_blocks(data: bytes, key: bytes) -> bytes:
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        decryptor = Cipher(algorithms.AES(key), modes.ECB()).decryptor()
+        return decryptor.update(data) + decryptor.finalize()
+
+    @staticmethod
+    def _cbc(key: bytes, iv: bytes, decrypt: bool):
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
+        context = cipher.decryptor() if decrypt else cipher.encryptor()
+
+        def process(blocks, output=None):
+            result = context.update(blocks)
+            if output is None:
+                return result
+            output[: len(result)] = result
+
+        return process
+
+    @staticmethod
+    def _oaep():
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding
+
+        # the same parameters as PKCS1_OAEP of pycryptodome
+        return padding.OAEP(
+            mgf=padding.MGF1(algorithm=hashes.SHA1()),
+            algorithm=hashes.SHA1(),
+            label=None,
+        )
+
+    @staticmethod
+    def decrypt_key(encrypted_key: bytes, private_key) -> bytes:
+        return private_key.decrypt(base64.b64decode(encrypted_key), OpenSSLCrypto._oaep())
+
+    @staticmethod
+    def load_private_key(encrypted_key: bytes, encryption_password: str):
+        from cryptography.hazmat.primitives import serialization
+
+        if isinstance(encrypted_key, str):
+            encrypted_key = encrypted_key.encode("utf-8")
+        if isinstance(encryption_password, str):
+            encryption_password = encryption_password.encode("utf-8")
+
+        return serialization.load_pem_private_key(encrypted_key, encryption_password)
+
+    @staticmethod
+    def export_private_key(private_key) -> str:
+        from cryptography.hazmat.primitives import serialization
+
+        return private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ).decode("utf-8")
+
+    @staticmethod
+    def load_public_key(public_key: str):
+        from cryptography.hazmat.primitives import serialization
+
+        if isinstance(public_key, str):
+            public_key = public_key.encode("utf-8")
+
+        return serialization.load_pem_public_key(public_key)
+
+    @staticmethod
+    def encrypt_key(key: bytes, public_key) -> str:
+        encrypted = public_key.encrypt(key, OpenSSLCrypto._oaep())
+        return base64.b64encode(encrypted).decode("utf-8")
+
+    @staticmethod
+    def public_key(private_key):
+        return private_key.public_key()
+
+    @staticmethod
+    def random_bytes(length: int) -> bytes:
+        import os
+
+        return os.urandom(length)
+
+
+CRYPTO_BACKENDS = {"pycryptodome": CryptoUtils, "openssl": OpenSSLCrypto}
+
+
+def get_backend(backend="pycryptodome"):
+    """## Returns a crypto backend.
+
+    #### Args:
+        backend (str | type, optional): "pycryptodome", "openssl" or a backend class.
+            Defaults to "pycryptodome".
+
+    #### Returns:
+        type: The backend class.
+    """
+    if not isinstance(backend, str):
+        return backend
+
+    if backend not in CRYPTO_BACKENDS:
+        raise ValueError(f"crypto_backend must be one of {tuple(CRYPTO_BACKENDS)}")
+
+    if backend == "openssl":
+        try:
+            import cryptography  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "The openssl crypto backend needs cryptography: pip install stashconnect[openssl]"
+            ) from None
+
+    return CRYPTO_BACKENDS[backend]
@@ -0,0 +1,329 @@
+import bisect
+import re
+import threading
+import time
+
+_TOKEN = re.compile(r"\w+")
+
+# a channel counts as changed if one of these differs from the last refresh
+WATCHED_FIELDS = (
+    "last_action",
+    "name",
+    "description",
+    "type",
+    "encrypted",
+    "visible",
+    "user_count",
+    "membership",
+)
+# only changes of these need new index tokens
+INDEXED_FIELDS = ("name", "description")
+
+
+def _differs(old: dict, new: dict, fields) -> bool:
+    return any(old.get(field) != new.get(field) for field in fields)
+
+
+def _tokens(text) -> list:
+    return _TOKEN.findall(str(text or "").casefold())
+
+
+def _last_action(channel: dict) -> int:
+    try:
+        return int(channel.get("last_action") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ChannelDirectory:
+    """## A local, searchable index of the visible and joined channels of a company.
+
+    The listings are fetched as raw dicts, so no Channel or Company objects
+    are built. A refresh stores the channels whose activity, name,
+    description, type, visibility, member count or membership changed and
+    re-indexes them if their name or description changed. Searches refresh
+    the directory first once it is older than `max_age`.
+
+    The visible listing is paged like in ChatSync: when its pages are sorted
+    by last_action, an incremental refresh stops at the first page that is
+    older than the previous refresh. Every `full_every` refreshes all pages
+    are read, which also drops the channels that disappeared. The joined
+    channels are listed through channels/subscripted on every refresh, so the
+    `member` filter also finds joined channels that are not visible.
+
+    #### Attributes:
+        .company_id (str): The company of the directory.
+        .max_age (float): Seconds after which a search refreshes first (None never).
+        .full_every (int): Every how many refreshes all pages are read (None only the first).
+        .refreshed_at (float): The time.monotonic() of the last refresh (or None).
+        .refreshes (int): The amount of finished refreshes.
+        .requests (int): The amount of listing requests.
+        .updated (int): Channels that were new or changed in the last refresh.
+    """
+
+    def __init__(
+        self,
+        client,
+        company_id: int | str,
+        *,
+        max_age: float = 300,
+        page_size: int = 100,
+        full_every: int = 10,
+    ):
+        self.client = client
+        self.company_id = str(company_id)
+        self.max_age = max_age
+        self.page_size = page_size
+        self.full_every = full_every
+
+        self.refreshed_at = None
+        self.refreshes = 0
+        self.requests = 0
+        self.updated = 0
+
+        self._channels = {}
+        self._visible = set()
+        self._joined = set()
+        self._index = {}
+        self._sorted_tokens = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._channels)
+
+    def __contains__(self, channel_id):
+        return str(channel_id) in self._channels
+
+    def _post(self, url, data):
+        with self._lock:
+            self.requests += 1
+        return self.client._post(url, data=data)
+
+    def _list(self, full: bool) -> tuple[list, bool]:
+        with self._lock:
+            known = dict(self._channels)
+        watermark = max(map(_last_action, known.values()), default=None)
+
+        channels = []
+
+        while True:
+            response = self._post(
+                "channels/visible",
+                data={
+                    "company": self.company_id,
+                    "limit": self.page_size,
+                    "offset": len(channels),
+                    "search": "",
+                },
+            )
+            page = response["channels"]
+            channels.extend(page)
+
+            if len(page) < self.page_size:
+                return channels, True
+
+            if full or watermark is None:
+                continue
+
+            actions = [_last_action(channel) for channel in page]
+            if actions != sorted(actions, reverse=True):
+                # not sorted by activity, every page has to be read
+                full = True
+                continue
+
+            if actions[-1] < watermark and all(
+                str(channel["id"]) in known
+                and not _differs(known[str(channel["id"])], channel, WATCHED_FIELDS)
+                for channel in page
+                if _last_action(channel) < watermark
+            ):
+                # the remaining pages are older than the previous refresh
+                return channels, False
+
+    def _list_joined(self) -> list:
+        response = self._post("channels/subscripted", {"company": self.company_id})
+        return response["channels"]
+
+    def refresh(self, *, full: bool = None) -> int:
+        """## Brings the directory up to date.
+
+        #### Args:
+            full (bool, optional): Read every page. Defaults to every `full_every` refreshes.
+
+        #### Returns:
+            int: The amount of new or changed channels.
+        """
+        with self._refresh_lock:
+            if full is None:
+                full = self.refreshes == 0 or (
+                    self.full_every is not None and self.refreshes % self.full_every == 0
+                )
+
+            visible, complete = self._list(full)
+            joined = self._list_joined()
+
+            listed = {str(channel["id"]): channel for channel in visible}
+            visible_ids = set(listed) if complete else self._visible | set(listed)
+
+            for channel in joined:
+                # joined channels that are not visible are only in this listing
+                if str(channel["id"]) not in visible_ids:
+                    listed[str(channel["id"])] = channel
+
+            with self._lock:
+                current = self._channels
+
+            changed = {
+                channel_id: channel
+                for channel_id, channel in listed.items()
+                if channel_id not in current
+                or _differs(current[channel_id], channel, WATCHED_FIELDS)
+            }
+            reindex = [
+                channel_id
+                for channel_id, channel in changed.items()
+                if channel_id not in current
+                or _differs(current[channel_id], channel, INDEXED_FIELDS)
+            ]
+            removed = []
+            if complete:
+                removed = [channel_id for channel_id in current if channel_id not in listed]
+
+            with self._lock:
+                for channel_id in removed + reindex:
+                    self._unindex(channel_id)
+
+                # the filters read the stored dicts, so they are always current
+                self._channels.update(changed)
+                self._visible = visible_ids
+                self._joined = {str(channel["id"]) for channel in joined}
+
+                for channel_id in reindex:
+                    for token in self._channel_tokens(changed[channel_id]):
+                        self._index.setdefault(token, set()).add(channel_id)
+
+                if removed or reindex:
+                    self._sorted_tokens = sorted(self._index)
+
+            self.refreshed_at = time.monotonic()
+            self.refreshes += 1
+            self.updated = len(changed)
+            return self.updated
+
+    def _channel_tokens(self, channel) -> set:
+        return set(_tokens(channel.get("name"))) | set(_tokens(channel.get("description")))
+
+    def _unindex(self, channel_id):
+        channel = self._channels.pop(channel_id, None)
+        if channel is None:
+            return
+
+        for token in self._channel_tokens(channel):
+            ids = self._index.get(token)
+            if ids is not None:
+                ids.discard(channel_id)
+                if not ids:
+                    del self._index[token]
+
+    def _prefix_matches(self, prefix) -> set:
+        matches = set()
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches |= self._index[token]
+
+        return matches
+
+    def _stale(self) -> bool:
+        if self.refreshed_at is None:
+            return True
+        if self.max_age is None:
+            return False
+        return time.monotonic() - self.refreshed_at > self.max_age
+
+    def search(
+        self,
+        query: str = "",
+        *,
+        limit: int = 10,
+        type: str = None,
+        encrypted: bool = None,
+        member: bool = None,
+    ) -> list:
+        """## Finds channels by name and description.
+
+        Every word of the query has to be the start of a word of the name or
+        description. Exact and prefix name matches are ranked first.
+
+        #### Args:
+            query (str, optional): The search text. Defaults to "" (all channels).
+            limit (int, optional): The maximum amount of results. Defaults to 10.
+            type (str, optional): Only channels of this type (e.g. "public"). Defaults to None.
+            encrypted (bool, optional): Only (un)encrypted channels. Defaults to None.
+            member (bool, optional): Only channels the client is (not) a member of. Defaults to None.
+
+        #### Returns:
+            list: The matching channels as dicts.
+        """
+        if self._stale():
+            self.refresh()
+
+        words = _tokens(query)
+
+        with self._lock:
+            if words:
+                ids = None
+                for word in words:
+                    matches = self._prefix_matches(word)
+                    ids = matches if ids is None else ids & matches
+                    if not ids:
+                        return []
+            else:
+                ids = set(self._channels)
+
+            channels = [self._channels[channel_id] for channel_id in ids]
+
+        channels = [
+            channel
+            for channel in channels
+            if (type is None or channel.get("type") == type)
+            and (encrypted is None or bool(channel.get("encrypted")) == encrypted)
+            and (member is None or self._is_member(channel) == member)
+        ]
+
+        phrase = " ".join(words)
+
+        def rank(channel):
+            name = " ".join(_tokens(channel.get("name")))
+            name_words = name.split()
+
+            if name == phrase:
+                score = 0
+            elif name.startswith(phrase):
+                score = 1
+            elif all(any(token.startswith(word) for token in name_words) for word in words):
+                score = 2
+            else:
+                score = 3
+            return score, name
+
+        channels.sort(key=rank)
+        return channels[:limit]
+
+    def get(self, channel_id: int | str) -> dict | None:
+        """## Returns a channel of the directory as a dict.
+
+        #### Args:
+            channel_id (int | str): The channels id.
+        """
+        with self._lock:
+            return self._channels.get(str(channel_id))
+
+    def _is_member(self, channel) -> bool:
+        if str(channel["id"]) in self._joined:
+            return True
+        membership = channel.get("membership") or {}
+        return bool(membership.get("is_member"))
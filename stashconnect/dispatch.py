@@ -0,0 +1,234 @@
+import collections
+import threading
+import time
+
+from .hedging import LatencyTracker
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+
+def event_key(args: tuple) -> str | None:
+    """## Returns the chat an event belongs to.
+
+    #### Args:
+        args (tuple): The raw socket.io event arguments.
+
+    #### Returns:
+        str | None: A key like "channel:123" or None if the event has no chat.
+    """
+    if args and isinstance(args[0], dict):
+        payload = args[0]
+        message = payload.get("message")
+
+        if isinstance(message, dict):
+            if message.get("channel_id"):
+                return f"channel:{message['channel_id']}"
+            if message.get("conversation_id"):
+                return f"conversation:{message['conversation_id']}"
+
+        for name in ("channel_id", "conversation_id", "type_id"):
+            if payload.get(name):
+                return f"{name.split('_')[0]}:{payload[name]}"
+
+    # typing events are sent as (type, type_id, user_id)
+    elif len(args) >= 2 and isinstance(args[1], str | int):
+        return f"{args[0]}:{args[1]}"
+
+    return None
+
+
+class EventQueue:
+    """## A bounded FIFO queue with an overflow policy.
+
+    With "spill" nothing is lost: events past the bound go to an unbounded
+    overflow deque and move into the queue as it drains, so the order is kept.
+    The overflow is counted, and its current and peak size are reported, so
+    a growing backlog is visible.
+
+    #### Attributes:
+        .maxsize (int): The bound of the queue.
+        .overflow (str): "block", "drop_oldest" or "spill".
+        .dropped (int): Events dropped by the drop_oldest policy.
+        .spilled (int): Events that went to the overflow deque.
+        .spill_peak (int): The largest size the overflow deque reached.
+    """
+
+    def __init__(self, maxsize: int = 1000, overflow: str = "block"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.spilled = 0
+        self.spill_peak = 0
+
+        self._items = collections.deque()
+        self._spill = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def __len__(self):
+        return len(self._items) + len(self._spill)
+
+    @property
+    def spill_depth(self) -> int:
+        """## The events currently waiting in the overflow deque."""
+        return len(self._spill)
+
+    def put(self, item) -> None:
+        """## Adds an item, applying the overflow policy when the queue is full."""
+        with self._condition:
+            if self._spill or len(self._items) >= self.maxsize:
+                if self.overflow == "block":
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._condition.wait()
+                elif self.overflow == "spill":
+                    # newer than everything in the queue, so the order is kept
+                    self._spill.append(item)
+                    self.spilled += 1
+                    self.spill_peak = max(self.spill_peak, len(self._spill))
+                    self._condition.notify_all()
+                    return
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+
+            self._items.append(item)
+            self._condition.notify_all()
+
+    def get(self):
+        """## Takes the oldest item or returns None once the queue is closed and empty."""
+        with self._condition:
+            while not self._items and not self._closed:
+                self._condition.wait()
+
+            if not self._items:
+                return None
+
+            item = self._items.popleft()
+            if self._spill:
+                self._items.append(self._spill.popleft())
+            self._condition.notify_all()
+            return item
+
+    def close(self) -> None:
+        """## Wakes up all waiting threads; remaining items are still handed out."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class EventDispatcher:
+    """## Runs event handlers on a pool of worker threads.
+
+    Every chat is mapped to one worker so its events are handled in order,
+    while events of different chats run in parallel.
+
+    #### Attributes:
+        .workers (int): The amount of worker threads.
+        .latency (LatencyTracker): The handler runtime per event name.
+        .wait_time (LatencyTracker): The time events spent queued per event name.
+        .processed (int): The amount of handled events.
+        .errors (int): The amount of handlers that raised.
+    """
+
+    def __init__(
+        self,
+        handler=None,
+        *,
+        workers: int = 4,
+        queue_size: int = 1000,
+        overflow: str = "block",
+    ):
+        self.handler = handler
+        self.workers = workers
+
+        self.latency = LatencyTracker()
+        self.wait_time = LatencyTracker()
+        self.processed = 0
+        self.errors = 0
+
+        self._queues = [
+            EventQueue(queue_size, overflow) for _ in range(workers)
+        ]
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """## Starts the worker threads."""
+        for index, queue in enumerate(self._queues):
+            thread = threading.Thread(
+                target=self._work,
+                args=(queue,),
+                name=f"stashconnect-worker-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = None) -> None:
+        """## Stops the workers after the queued events are handled.
+
+        #### Args:
+            timeout (float, optional): The maximum time to wait per worker. Defaults to None.
+        """
+        for queue in self._queues:
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, name: str, args: tuple, handler=None) -> None:
+        """## Queues an event for its chats worker.
+
+        #### Args:
+            name (str): The event name.
+            args (tuple): The raw event arguments.
+            handler (callable, optional): Handles this event instead of the default handler.
+        """
+        key = event_key(args)
+        if key is None:
+            key = name
+
+        queue = self._queues[hash(key) % self.workers]
+        queue.put((name, args, handler or self.handler, time.perf_counter()))
+
+    def _work(self, queue):
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+
+            name, args, handler, queued_at = item
+            start_time = time.perf_counter()
+            self.wait_time.record(name, start_time - queued_at)
+
+            try:
+                handler(name, args)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"Error in handler for '{name}': {e!r}")
+
+            self.latency.record(name, time.perf_counter() - start_time)
+            with self._lock:
+                self.processed += 1
+
+    def stats(self) -> dict:
+        """## Returns queue depths and handler latencies.
+
+        #### Returns:
+            dict: The dispatcher statistics.
+        """
+        return {
+            "depth": sum(len(queue) for queue in self._queues),
+            "depths": [len(queue) for queue in self._queues],
+            "processed": self.processed,
+            "errors": self.errors,
+            "dropped": sum(queue.dropped for queue in self._queues),
+            "spilled": sum(queue.spilled for queue in self._queues),
+            "spill_depth": sum(queue.spill_depth for queue in self._queues),
+            "spill_peak": max((queue.spill_peak for queue in self._queues), default=0),
+            "latency": self.latency.stats(),
+            "wait_time": self.wait_time.stats(),
+        }
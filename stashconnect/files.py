@@ -1,17 +1,14 @@
-import Crypto
-import Crypto.Random
-import Crypto.Util
-
 import os
 import mimetypes
 import uuid
-from PIL import Image
 from io import BytesIO
 import base64
 import json
 
-from .crypto_utils import CryptoUtils
 from .models import Channel, Conversation, File
+from .timeouts import with_deadline
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class FileManager:
@@ -29,6 +26,7 @@ class FileManager:
         )
         return response["quota"]
 
+    @with_deadline
     def upload(
         self,
         target: str | int,
@@ -45,6 +43,7 @@ class FileManager:
             filename(str): Only needed for bytes and BytesIO. Defaults to "file".
             encrypted (bool, optional): Sets whether a file should be encrypted. Defaults to True.
             preview (bool, optional): Sets whether a preview image should be set. Defaults to True.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             File: A file object.
@@ -78,8 +77,8 @@ class FileManager:
                 return
 
             # generate random iv and file key
-            iv = Crypto.Random.get_random_bytes(16)
-            file_key = Crypto.Random.get_random_bytes(32)
+            iv = self.client.crypto.random_bytes(16)
+            file_key = self.client.crypto.random_bytes(32)
 
         # guess content type from extension
         content_type = mimetypes.guess_type(filename)[0]
@@ -90,6 +89,8 @@ class FileManager:
         upload_identifier = str(uuid.uuid4())  # the uploads id
 
         try:
+            from PIL import Image
+
             if isinstance(file_input, BytesIO | bytes):
                 image = Image.open(BytesIO(file_content))
             else:
@@ -110,7 +111,7 @@ class FileManager:
 
             # encrypt the chunk
             if encrypted:
-                encrypted_chunk = CryptoUtils.encrypt_aes(data_chunk, file_key, iv)
+                encrypted_chunk = self.client.crypto.encrypt_aes(data_chunk, file_key, iv)
             else:
                 encrypted_chunk = data_chunk
 
@@ -148,13 +149,13 @@ class FileManager:
         if encrypted:
             # sets a file access key for encrypted files
 
-            iv = Crypto.Random.get_random_bytes(16)
+            iv = self.client.crypto.random_bytes(16)
 
             data = {
                 "file_id": file_id,
                 "target": target_type,
                 "target_id": target,
-                "key": CryptoUtils.encrypt_aes(
+                "key": self.client.crypto.encrypt_aes(
                     file_key, self.client.get_conversation_key(target, target_type), iv
                 ).hex(),
                 "iv": iv.hex(),
@@ -178,6 +179,8 @@ class FileManager:
             File | dict: A file object or a status: false dict.
         """
         try:
+            from PIL import Image
+
             with Image.open(filepath) as image:
                 output_size = 100
 
@@ -211,6 +214,7 @@ class FileManager:
         except Exception:
             return {"success": False}
 
+    @with_deadline
     def download(self, id: str | int, directory: str = "", filename: str = None) -> str:
         """## Downloads a file to a local location.
 
@@ -218,11 +222,14 @@ class FileManager:
             id (str | int): The files id.
             directory (str, optional): The download dir. Defaults to main.
             filename (str, optional): The new filename. Defaults to the main name.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             str: The path of the saved file.
         """
-        response = self.client._post(f"file/download?id={id}", data={}, return_all=True)
+        response = self.client._post(
+            f"file/download?id={id}", data={}, return_all=True, stream=True
+        )
 
         if filename is None:
             file_info = self.client.files._info(id)
@@ -238,9 +245,10 @@ class FileManager:
                     print(
                         "Could not download encrypted content as no encryption password was provided"
                     )
+                    response.close()
                     return
 
-                key = CryptoUtils.decrypt_aes(
+                key = self.client.crypto.decrypt_aes(
                     bytes.fromhex(file_info["keys"][0]["key"]),
                     self.client.get_conversation_key(
                         file_info["keys"][0]["chat_id"],
@@ -249,22 +257,30 @@ class FileManager:
                     ),
                     bytes.fromhex(file_info["keys"][0]["iv"]),
                 )
-                decrypted = CryptoUtils.decrypt_aes(
-                    response.content,
-                    key,
-                    bytes.fromhex(file_info["e2e_iv"]),
+                decryptor = self.client.crypto.aes_decryptor(
+                    key, bytes.fromhex(file_info["e2e_iv"])
                 )
-                file.write(decrypted)
+
+                # decrypt chunk by chunk into one buffer, so memory stays constant
+                buffer = bytearray(DOWNLOAD_CHUNK_SIZE + 16)
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    written = decryptor.update_into(chunk, buffer)
+                    file.write(memoryview(buffer)[:written])
+
+                file.write(decryptor.finalize())
             else:
-                file.write(response.content)
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
 
         return file_path
 
+    @with_deadline
     def download_bytes(self, id: str | int) -> bytes:
         """## Downloads a file and returns its content as bytes.
 
         #### Args:
             id (str | int): The file's id.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             str: The path of the saved file.
@@ -279,7 +295,7 @@ class FileManager:
                 )
                 return
 
-            key = CryptoUtils.decrypt_aes(
+            key = self.client.crypto.decrypt_aes(
                 bytes.fromhex(file_info["keys"][0]["key"]),
                 self.client.get_conversation_key(
                     file_info["keys"][0]["chat_id"],
@@ -288,7 +304,7 @@ class FileManager:
                 ),
                 bytes.fromhex(file_info["keys"][0]["iv"]),
             )
-            decrypted = CryptoUtils.decrypt_aes(
+            decrypted = self.client.crypto.decrypt_aes(
                 response.content,
                 key,
                 bytes.fromhex(file_info["e2e_iv"]),
@@ -309,11 +325,13 @@ class FileManager:
         response = self.client._post("file/info", data={"file_id": id})
         return response["file"]
 
+    @with_deadline
     def info(self, id: str | int) -> File:
         """## Fetches the info of a file.
 
         #### Args:
             id (str | int): The files id.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             File: A file object.
@@ -321,11 +339,13 @@ class FileManager:
         response = self.client._post("file/info", data={"file_id": id})
         return File(self.client, response["file"])
 
+    @with_deadline
     def infos(self, ids: str | int | list) -> list:
         """## Fetches mutliple files.
 
         #### Args:
             ids (str | int | list): The files ids.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             list: A list of files.
@@ -0,0 +1,182 @@
+import collections
+import concurrent.futures
+import contextvars
+import threading
+
+
+class LatencyTracker:
+    """## Keeps the recent latencies (seconds) per key.
+
+    #### Attributes:
+        .window (int): How many samples are kept per key.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        """## Records a latency sample.
+
+        #### Args:
+            key (str): The key (e.g. an endpoint).
+            seconds (float): The measured latency.
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[key] += 1
+
+    def percentile(self, key: str, percentile: float) -> float | None:
+        """## Returns a percentile of the recent latencies.
+
+        #### Args:
+            key (str): The key.
+            percentile (float): The percentile (0-100).
+
+        #### Returns:
+            float | None: The latency in seconds or None without samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+
+        if not samples:
+            return None
+
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def count(self, key: str) -> int:
+        """## Returns the amount of samples kept for a key."""
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def stats(self, key: str = None) -> dict:
+        """## Returns count, p50, p95 and p99 in milliseconds.
+
+        #### Args:
+            key (str, optional): A single key. Defaults to all keys.
+
+        #### Returns:
+            dict: The statistics per key (or of one key).
+        """
+        with self._lock:
+            keys = [key] if key is not None else list(self._samples)
+            counts = {name: self._counts[name] for name in keys}
+
+        stats = {}
+
+        for name in keys:
+            stats[name] = {"count": counts[name]}
+
+            for p in (50, 95, 99):
+                value = self.percentile(name, p)
+                stats[name][f"p{p}"] = None if value is None else round(value * 1000, 2)
+
+        return stats[key] if key is not None else stats
+
+
+class HedgePolicy:
+    """## Sends a duplicate of slow idempotent reads.
+
+    If a read has not answered after the configured percentile of its recent
+    latency, the same request is sent on another pooled connection and the
+    first response wins.
+
+    #### Attributes:
+        .percentile (float): The latency percentile used as hedge threshold.
+        .min_samples (int): Samples needed before hedging an endpoint.
+        .min_delay (float): The lowest hedge threshold (seconds).
+        .max_delay (float): The highest hedge threshold (seconds).
+        .endpoints (set): The endpoints which may be hedged.
+        .hedged (int): How many duplicates were sent.
+        .won (int): How many duplicates answered first.
+    """
+
+    default_endpoints = {"message/content", "users/info", "file/info"}
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 95,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_delay: float = 2.0,
+        endpoints: set | list | tuple = None,
+        max_workers: int = 8,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.endpoints = set(
+            self.default_endpoints if endpoints is None else endpoints
+        )
+
+        self.hedged = 0
+        self.won = 0
+        self._lock = threading.Lock()
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="stashconnect-hedge"
+        )
+
+    def threshold(self, tracker: LatencyTracker, endpoint: str) -> float | None:
+        """## Returns the hedge threshold of an endpoint.
+
+        #### Args:
+            tracker (LatencyTracker): The latency tracker.
+            endpoint (str): The endpoint.
+
+        #### Returns:
+            float | None: The delay in seconds or None if there are too few samples.
+        """
+        if tracker.count(endpoint) < self.min_samples:
+            return None
+
+        delay = tracker.percentile(endpoint, self.percentile)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def run(self, func, delay: float):
+        """## Runs func and starts a duplicate after delay seconds.
+
+        #### Args:
+            func (callable): The request (called without arguments).
+            delay (float): The hedge threshold in seconds.
+
+        #### Returns:
+            The result of whichever call finished first.
+        """
+        # both calls keep the deadline of the caller
+        primary = self._executor.submit(contextvars.copy_context().run, func)
+
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        with self._lock:
+            self.hedged += 1
+        backup = self._executor.submit(contextvars.copy_context().run, func)
+
+        pending = {primary, backup}
+        error = None
+
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self.won += 1
+                    return future.result()
+                error = future.exception()
+
+        raise error
@@ -0,0 +1,151 @@
+import threading
+import time
+
+from .hedging import LatencyTracker
+
+
+class LatencyProbe:
+    """## Measures push socket and REST round trips in the background.
+
+    The socket probe emits `ack_event` and waits for the server to
+    acknowledge it (a socket.io ack), so nothing is sent to a chat and no
+    other client sees the probe. The Engine.IO heartbeat is started by the
+    server, so it can not be timed from the client; without an `ack_event`
+    only the REST endpoint is probed. Only one socket probe is in flight at
+    a time, and a probe without an ack within the timeout counts as lost.
+
+    #### Attributes:
+        .ack_event (str): The event used for socket probes (or None).
+        .ack_data: The data sent with the ack event (or None).
+        .interval (float): The time between probes (seconds).
+        .timeout (float): The time after which a probe counts as lost (seconds).
+        .rest_endpoint (str): The endpoint used for REST probes (or None).
+        .on_sample (callable): Called with (kind, milliseconds) for every sample.
+        .samples (LatencyTracker): The round trips of "ws" and "rest".
+        .lost (int): The amount of lost socket probes.
+    """
+
+    def __init__(
+        self,
+        client,
+        ack_event: str = None,
+        *,
+        ack_data=None,
+        interval: float = 10,
+        timeout: float = 5,
+        rest_endpoint: str = "notifications/count",
+        on_sample=None,
+    ):
+        self.client = client
+        self.ack_event = ack_event
+        self.ack_data = ack_data
+        self.interval = interval
+        self.timeout = timeout
+        self.rest_endpoint = rest_endpoint
+        self.on_sample = on_sample
+
+        self.samples = LatencyTracker()
+        self.lost = 0
+        self.last = {"ws": None, "rest": None}
+
+        self._in_flight = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """## Starts probing in a background thread."""
+        if self._thread is not None:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="stashconnect-latency", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """## Stops probing."""
+        self._stopped.set()
+        self._wake.set()
+        self._thread = None
+
+    def request(self) -> None:
+        """## Probes now instead of after the interval, without waiting for the result."""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"Latency probe failed: {e!r}")
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def probe(self) -> None:
+        """## Sends one socket and one REST probe."""
+        if self.ack_event is not None and self._socket_connected():
+            self.send_ws_probe()
+
+        if self.rest_endpoint is not None:
+            start_time = time.perf_counter()
+            self.client._post(self.rest_endpoint, data={})
+            self._record("rest", time.perf_counter() - start_time)
+
+    def send_ws_probe(self) -> float | None:
+        """## Emits the ack event and waits for the acknowledgement.
+
+        #### Returns:
+            float | None: The round trip in seconds, or None if the probe was lost
+            or another one is still in flight.
+        """
+        with self._lock:
+            if self._in_flight:
+                return None
+            self._in_flight = True
+
+        try:
+            from socketio.exceptions import TimeoutError as AckTimeout
+
+            start_time = time.perf_counter()
+            try:
+                self.client.sio.call(self.ack_event, self.ack_data, timeout=self.timeout)
+            except AckTimeout:
+                with self._lock:
+                    self.lost += 1
+                return None
+
+            rtt = time.perf_counter() - start_time
+            self._record("ws", rtt)
+            return rtt
+
+        finally:
+            with self._lock:
+                self._in_flight = False
+
+    def _record(self, kind, seconds):
+        self.samples.record(kind, seconds)
+        self.last[kind] = round(seconds * 1000, 2)
+
+        if self.on_sample is not None:
+            self.on_sample(kind, self.last[kind])
+
+    def _socket_connected(self) -> bool:
+        return self.client.sio is not None and self.client.sio.connected
+
+    def stats(self) -> dict:
+        """## Returns the rolling round trip statistics (non-blocking).
+
+        #### Returns:
+            dict: count, p50, p95, p99 and last (milliseconds) for "ws" and "rest".
+        """
+        stats = {}
+
+        for kind in ("ws", "rest"):
+            stats[kind] = {**self.samples.stats(kind), "last": self.last[kind]}
+
+        stats["ws"]["lost"] = self.lost
+        return stats
@@ -1,26 +1,15 @@
-import Crypto.Cipher
-import Crypto.Cipher.AES
-import Crypto.Cipher.PKCS1_OAEP
-import Crypto.Protocol
-import Crypto.PublicKey
-import Crypto.PublicKey.RSA
-import Crypto
-
-import Crypto.Random
-import Crypto.Util
-import Crypto.Util.Padding
-
 import json
 from typing import Generator
 
-from .crypto_utils import CryptoUtils
 from .models import Message
+from .timeouts import with_deadline
 
 
 class MessageManager:
     def __init__(self, client):
         self.client = client
 
+    @with_deadline
     def send(
         self,
         target: str | int,
@@ -43,6 +32,7 @@ class MessageManager:
             urls (str | list, optional): Url's to append to the message. Defaults to "".
             location (bool | tuple | list, optional): The location of the message. Defaults to None.
             encrypted (bool, optional): If the message should be encrypted. Defaults to True.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Info:
             :The location needs to be set to (lat, lng) in a tuple or None.
@@ -59,11 +49,11 @@ class MessageManager:
                 )
                 return
 
-            iv = Crypto.Random.get_random_bytes(16)
+            iv = self.client.crypto.random_bytes(16)
             conversation_key = self.client.get_conversation_key(target, target_type)
 
             text_bytes = text.encode("utf-8")
-            text = CryptoUtils.encrypt_aes(text_bytes, conversation_key, iv)
+            text = self.client.crypto.encrypt_aes(text_bytes, conversation_key, iv)
 
         files_sent = []
 
@@ -120,10 +110,10 @@ class MessageManager:
             location = self.client.account.location()
 
             if encrypted:
-                data["latitude"] = CryptoUtils.encrypt_aes(
+                data["latitude"] = self.client.crypto.encrypt_aes(
                     str(location["latitude"]).encode("utf-8"), conversation_key, iv=iv
                 ).hex()
-                data["longitude"] = CryptoUtils.encrypt_aes(
+                data["longitude"] = self.client.crypto.encrypt_aes(
                     str(location["longitude"]).encode("utf-8"), conversation_key, iv=iv
                 ).hex()
             else:
@@ -133,11 +123,11 @@ class MessageManager:
         elif isinstance(location, tuple | list):
 
             if encrypted:
-                data["latitude"] = CryptoUtils.encrypt_aes(
+                data["latitude"] = self.client.crypto.encrypt_aes(
                     str(location[0]).encode("utf-8"), conversation_key, iv=iv
                 ).hex()
 
-                data["longitude"] = CryptoUtils.encrypt_aes(
+                data["longitude"] = self.client.crypto.encrypt_aes(
                     str(location[1]).encode("utf-8"), conversation_key, iv=iv
                 ).hex()
             else:
@@ -172,13 +162,56 @@ class MessageManager:
                         target, target_type, key=key
                     )
 
-                    text = CryptoUtils.decrypt_aes(
+                    text = self.client.crypto.decrypt_aes(
                         bytes.fromhex(text), conversation_key, bytes.fromhex(iv)
                     )
                     return text.decode("utf-8")
             except Exception:
                 return text
 
+    def decode_many(self, target: str, messages: list) -> list:
+        """## Decodes the texts of several messages of one chat at once.
+
+        #### Args:
+            target (str): The types id.
+            messages (list): The raw messages.
+
+        #### Returns:
+            list: The text of every message (encrypted if it could not be decoded).
+        """
+        texts = [message["text"] for message in messages]
+
+        if self.client._private_key is None:
+            return texts
+
+        encrypted = [
+            index
+            for index, message in enumerate(messages)
+            if message["encrypted"] and message["text"] != ""
+        ]
+        if not encrypted:
+            return texts
+
+        try:
+            conversation_key = self.client.get_conversation_key(
+                target, self.client.tools.get_type(target)
+            )
+            plains = self.client.crypto.decrypt_many(
+                [(messages[index]["text"], messages[index]["iv"]) for index in encrypted],
+                conversation_key,
+            )
+        except Exception:
+            return texts
+
+        for index, plain in zip(encrypted, plains):
+            if plain is not None:
+                try:
+                    texts[index] = plain.decode("utf-8")
+                except UnicodeDecodeError:
+                    pass
+
+        return texts
+
     def like(self, message_id: str | int) -> dict:
         """## Likes a message.
 
@@ -212,11 +245,13 @@ class MessageManager:
         """
         return self.client._post("message/delete", data={"message_id": message_id})
 
+    @with_deadline
     def infos(self, message_ids: str | int | list) -> dict:
         """## Gets the infos of messages.
 
         #### Args:
             message_ids (str | int | list): The message ids.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             dict: The message infos
@@ -230,6 +265,7 @@ class MessageManager:
         )
         return [Message(self.client, message) for message in messages["messages"]]
 
+    @with_deadline
     def get_messages(
         self, type_id: str | int, limit: int = 30, offset: int = 0
     ) -> Generator[Message, None, None]:
@@ -239,6 +275,7 @@ class MessageManager:
             type_id (str | int): The types id
             limit (int, optional): The responses limit. Defaults to 30.
             offset (int, optional): The responses offset. Defaults to 0.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Yields:
             Generator[Message, None, None]: Message objects.
@@ -253,14 +290,15 @@ class MessageManager:
         }
 
         response = self.client._post("message/content", data=data)
-        response = response["messages"]
+        messages = [message for message in response["messages"] if message["kind"] == "message"]
 
-        for message in response:
-            if message["kind"] != "message":
-                continue
+        # the page is decrypted in one batch
+        texts = self.decode_many(type_id, messages)
 
-            yield Message(self.client, message)
+        for message, text in zip(messages, texts):
+            yield Message(self.client, message, content=text)
 
+    @with_deadline
     def get_flagged(
         self, type_id: str | int, limit: int = 100, offset: int = 0
     ) -> Generator[Message, None, None]:
@@ -270,6 +308,7 @@ class MessageManager:
             type_id (str | int): The types id.
             limit (int, optional): The responses limit. Defaults to 100.
             offset (int, optional): The responses offset. Defaults to 0.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Yields:
             Generator[Message, None, None]: Message objects.
@@ -284,13 +323,11 @@ class MessageManager:
         }
 
         response = self.client._post("message/list_flagged_messages", data=data)
-        response = response["messages"]
-
-        for message in response:
-            if message["kind"] != "message":
-                continue
+        messages = [message for message in response["messages"] if message["kind"] == "message"]
+        texts = self.decode_many(type_id, messages)
 
-            yield Message(self.client, message)
+        for message, text in zip(messages, texts):
+            yield Message(self.client, message, content=text)
 
     def flag(self, message_id: str | int) -> dict:
         """## Flags a message.
@@ -1,12 +1,13 @@
 # All returnable objects are stored here
 
-from .crypto_utils import CryptoUtils
 
 from typing import Generator
 
+from .timeouts import map_concurrent
+
 
 class Message:
-    def __init__(self, client, data):
+    def __init__(self, client, data, content=None):
         self.client = client
         self.id = data["id"]
 
@@ -25,7 +26,10 @@ class Message:
         self.encrypted = data["encrypted"]
         self.iv = data["iv"] if self.encrypted else None
 
-        if self.encrypted:
+        if content is not None:
+            # already decrypted with the rest of its page
+            self.content = content
+        elif self.encrypted:
             self.content = self.client.messages.decode(
                 data[f"{self.type}_id"], self.content_encrypted, self.iv
             )
@@ -59,13 +63,13 @@ class Message:
                 self.longitude = location["longitude"]
                 self.latitude = location["latitude"]
 
-            self.longitude = CryptoUtils.decrypt_aes(
+            self.longitude = self.client.crypto.decrypt_aes(
                 bytes.fromhex(location["longitude"]),
                 self.conversation_key,
                 bytes.fromhex(self.iv),
             ).decode("utf-8")
 
-            self.latitude = CryptoUtils.decrypt_aes(
+            self.latitude = self.client.crypto.decrypt_aes(
                 bytes.fromhex(location["latitude"]),
                 self.conversation_key,
                 bytes.fromhex(self.iv),
@@ -155,27 +159,38 @@ class Message:
         )
 
 
+# the fields User.set_attributes needs, members without them are fetched
+USER_FIELDS = (
+    "first_name",
+    "last_name",
+    "email",
+    "status",
+    "image",
+    "language",
+    "last_login",
+    "online",
+    "permissions",
+    "public_key",
+    "roles",
+)
+
+
+def _user_data(client, data) -> dict:
+    # complete user dicts are used as they are, others are fetched (and cached)
+    if isinstance(data, dict) and all(field in data for field in USER_FIELDS):
+        return data
+    return client.users._info(data["id"])
+
+
 class User:
     def __init__(self, client, data) -> None:
         self.client = client
         self.id = data["id"]
 
         try:
-            self.set_attributes(data)
-
-        except KeyError:
-            try:
-                user_data = self.client.users._info(self.id)
-                self.set_attributes(user_data)
-            except Exception as e:
-                print("could not fetch a users information - most likely due to missing permissions: ", e)
-
-        except TypeError:
-            try:
-                user_data = self.client.users._info(self.id)
-                self.set_attributes(user_data)
-            except Exception as e:
-                print("could not fetch a users information - most likely due to missing permissions: ", e)
+            self.set_attributes(_user_data(client, data))
+        except Exception as e:
+            print("could not fetch a users information - most likely due to missing permissions: ", e)
 
     def set_attributes(self, data):
         self.first_name = data["first_name"]
@@ -195,9 +210,19 @@ class User:
 
 
 class Conversation:
+    """## A conversation.
+
+    The members, callable users and the conversation key are resolved on
+    first access, so listing conversations costs no user requests or key
+    decryption.
+    """
+
     def __init__(self, client, data):
         self.client = client
         self.id = data["id"]
+        self._data = data
+        self._members = None
+        self._callable = None
 
         self.type = "conversation"
         self.type_id = data["id"]
@@ -206,9 +231,6 @@ class Conversation:
         self.channel_id = data["id"]
 
         self.key_sender = data["key_sender"]
-        self.conversation_key = self.client.get_conversation_key(
-            data["id"], self.type, key=data["key"]
-        )
 
         self.encrypted = data["encrypted"]
         self.favorited = data["favorite"]
@@ -223,8 +245,41 @@ class Conversation:
         self.unread_messages = data["unread_messages"]
         self.user_count = data["user_count"]
 
-        self.members = [User(self.client, member) for member in data["members"]]
-        self.callable = [User(self.client, member) for member in data["callable"]]
+    @property
+    def conversation_key(self):
+        """The decrypted conversation key (or None without a private key)."""
+        return self.client.get_conversation_key(self.id, self.type, key=self._data["key"])
+
+    @property
+    def member_ids(self) -> list:
+        """The ids of the members, without building User objects."""
+        return [str(member["id"]) for member in self._data["members"]]
+
+    @property
+    def members(self) -> list:
+        """The members as User objects."""
+        if self._members is None:
+            self._members = self._users(self._data["members"])
+        return self._members
+
+    @property
+    def callable(self) -> list:
+        """The callable users as User objects."""
+        if self._callable is None:
+            self._callable = self._users(self._data.get("callable") or [])
+        return self._callable
+
+    def _users(self, entries, concurrency: int = 8) -> list:
+        def complete(entry):
+            try:
+                return _user_data(self.client, entry)
+            except Exception:
+                # User prints why the info could not be fetched
+                return entry
+
+        # incomplete members are fetched in parallel (and cached) instead of one by one
+        entries = map_concurrent(complete, entries, concurrency)
+        return [User(self.client, entry) for entry in entries]
 
     def archive(self) -> dict:
         """## Archives a conversation.
@@ -275,9 +330,7 @@ class Company:
         self.client = client
 
         if "company_id" in data:
-            data = self.client._post(
-                "company/details", data={"company_id": data["company_id"]}
-            )["company"]
+            data = self.client.companies._details(data["company_id"])
 
         self.id = data["id"]
 
@@ -600,6 +653,20 @@ class Channel:
             self.id, search=search, limit=limit, offset=offset
         )
 
+    def members_all(
+        self, *, raw: bool = False, search: str | int = None
+    ) -> Generator[User | dict, None, None]:
+        """## Lists all members of the channel, fetching the pages concurrently.
+
+        #### Args:
+            raw (bool, optional): Yield the member dicts instead of User objects. Defaults to False.
+            search (str | int, optional): The search keyword that is used. Defaults to None.
+
+        #### Yields:
+            Generator[User | dict, None, None]: Every member once.
+        """
+        return self.client.channels.members_all(self.id, raw=raw, search=search)
+
     def join(self, *, password: str | int = ""):
         """## Joins a channel.
 
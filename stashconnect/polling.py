@@ -0,0 +1,312 @@
+import concurrent.futures
+import threading
+import time
+
+
+class PollingTransport:
+    """## Produces the push events by polling, for networks that block websockets.
+
+    Every chat is polled through message/content with its own interval: it
+    drops to `min_interval` when the chat is active and grows by `backoff`
+    up to `max_interval` while it is idle. A poll first asks for a few
+    messages and only fetches a full page when all of them are new. The
+    notifications are fetched only when notifications/count changed.
+
+    The results are delivered as the same raw events the push socket sends,
+    so the handlers do not know which transport is active. As with the
+    socket every message is delivered once: handler errors are printed and
+    counted, never retried. A chat whose poll fails backs off like an idle one.
+
+    With `joined` the joined channels and conversations are polled as well.
+    Their list is refreshed through `client.chats` every `joined_interval`
+    seconds, and chats whose listing changed are polled right away.
+
+    #### Attributes:
+        .chats (dict): The polled chats mapped to their last seen message id.
+        .intervals (dict): The current poll interval per chat (seconds).
+        .polls (int): The amount of message/content requests.
+        .delivered (int): The amount of delivered events.
+        .errors (int): The amount of failed chat polls and handler calls.
+    """
+
+    def __init__(
+        self,
+        client,
+        chats=None,
+        *,
+        min_interval: float = 2,
+        max_interval: float = 30,
+        backoff: float = 1.5,
+        concurrency: int = 4,
+        probe_limit: int = 5,
+        limit: int = 50,
+        notifications: bool = True,
+        joined: bool = True,
+        joined_interval: float = 300,
+        message_event: str = "message_sync",
+        notification_event: str = "notification",
+    ):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self.probe_limit = probe_limit
+        self.limit = limit
+        self.notifications = notifications
+        self.joined = joined
+        self.joined_interval = joined_interval
+        self.message_event = message_event
+        self.notification_event = notification_event
+
+        self.chats = {}
+        self.intervals = {}
+        self.polls = 0
+        self.delivered = 0
+        self.errors = 0
+
+        self._due = {}
+        self._explicit = set()
+        self._joined_due = 0.0
+        self._notification_count = None
+        self._notification_due = 0.0
+        self._notification_interval = min_interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        for chat in chats or ():
+            self.add(chat)
+
+    def add(self, chat) -> None:
+        """## Starts polling a chat.
+
+        #### Args:
+            chat (str | int | tuple): A chat id or a (type, id) tuple.
+        """
+        self._add(chat, explicit=True)
+
+    def _add(self, chat, explicit):
+        if not isinstance(chat, tuple):
+            chat = (self.client.tools.get_type(chat), chat)
+
+        chat = (chat[0], str(chat[1]))
+        if chat[0] not in ("channel", "conversation"):
+            raise ValueError(f"Unknown chat {chat[1]}")
+
+        with self._lock:
+            if explicit:
+                self._explicit.add(chat)
+
+            if chat not in self.chats:
+                # the first poll only records the last message id
+                self.chats[chat] = None
+                self.intervals[chat] = self.min_interval
+                self._due[chat] = 0.0
+
+    def remove(self, chat) -> None:
+        """## Stops polling a chat.
+
+        #### Args:
+            chat (str | int | tuple): A chat id or a (type, id) tuple.
+        """
+        with self._lock:
+            for key in list(self.chats):
+                if key == chat or key[1] == str(chat):
+                    del self.chats[key], self.intervals[key], self._due[key]
+                    self._explicit.discard(key)
+
+    def refresh_joined(self, deliver=None) -> None:
+        """## Updates the polled chats from the joined channels and conversations.
+
+        #### Args:
+            deliver (callable, optional): Gets the chat change events of `client.chats`.
+        """
+        sync = self.client.chats
+        first = sync.syncs == 0
+        changes = sync.sync(deliver or (lambda name, args: None))
+        self._joined_due = time.monotonic() + self.joined_interval
+
+        if first:
+            for chat in list(sync.snapshot):
+                self._add(chat, explicit=False)
+            return
+
+        for change in changes:
+            chat = (change["type"], change[f"{change['type']}_id"])
+
+            if change["change"] == "removed":
+                if chat not in self._explicit:
+                    self.remove(chat)
+            elif chat not in self.chats:
+                self._add(chat, explicit=False)
+            else:
+                with self._lock:
+                    # the listing shows activity, so do not wait for the backoff
+                    if chat in self._due:
+                        self._due[chat] = 0.0
+
+    def stop(self) -> None:
+        """## Stops polling after the running batch."""
+        self._stopped.set()
+
+    def run(self, deliver) -> None:
+        """## Polls until stop() is called.
+
+        #### Args:
+            deliver (callable): Called with (name, args) for every event.
+        """
+        self._stopped.clear()
+
+        with concurrent.futures.ThreadPoolExecutor(self.concurrency) as executor:
+            while not self._stopped.is_set():
+                try:
+                    if self.joined and self._joined_due <= time.monotonic():
+                        self.refresh_joined(deliver)
+                except Exception as e:
+                    self._joined_due = time.monotonic() + self.joined_interval
+                    print(f"Could not list the joined chats: {e!r}")
+
+                try:
+                    self.poll(deliver, executor)
+                except Exception as e:
+                    print(f"Polling failed: {e!r}")
+
+                self._stopped.wait(max(0.05, self._next_due() - time.monotonic()))
+
+    def poll(self, deliver, executor=None) -> int:
+        """## Polls the chats that are due once.
+
+        #### Args:
+            deliver (callable): Called with (name, args) for every event.
+            executor (Executor, optional): Runs the polls concurrently. Defaults to None.
+
+        #### Returns:
+            int: The amount of delivered events.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [chat for chat, at in self._due.items() if at <= now]
+
+        delivered = 0
+
+        if due:
+            if executor is None:
+                results = map(self._safe_poll, due)
+            else:
+                results = executor.map(self._safe_poll, due)
+
+            for chat, messages in zip(due, results):
+                if messages is None:
+                    # failed chats back off like idle ones instead of spinning
+                    self._reschedule(chat, False)
+                    continue
+
+                for message in messages:
+                    # like the socket, every message is delivered once
+                    self._commit(chat, int(message["id"]))
+                    try:
+                        deliver(self.message_event, ({"message": message},))
+                        delivered += 1
+                    except Exception as e:
+                        self.errors += 1
+                        print(f"Error in handler for '{self.message_event}': {e!r}")
+
+                self._reschedule(chat, bool(messages))
+
+        if self.notifications and self._notification_due <= now:
+            delivered += self._poll_notifications(deliver)
+
+        self.delivered += delivered
+        return delivered
+
+    def _safe_poll(self, chat):
+        try:
+            return self._poll_chat(chat)
+        except Exception as e:
+            self.errors += 1
+            print(f"Polling {chat[0]} {chat[1]} failed: {e!r}")
+            return None
+
+    def _commit(self, chat, message_id):
+        with self._lock:
+            if chat in self.chats:
+                self.chats[chat] = max(message_id, self.chats[chat] or 0)
+
+    def _poll_chat(self, chat):
+        last_id = self.chats.get(chat)
+
+        messages = self._fetch(chat, self.probe_limit)
+        if last_id is not None and messages and all(
+            int(message["id"]) > last_id for message in messages
+        ):
+            # more new messages than the probe returned
+            messages = self._fetch(chat, self.limit)
+
+        if not messages:
+            return []
+
+        if last_id is None:
+            # the first poll only records where the chat stands
+            self._commit(chat, max(int(message["id"]) for message in messages))
+            return []
+
+        new = [message for message in messages if int(message["id"]) > last_id]
+        return sorted(new, key=lambda message: int(message["id"]))
+
+    def _fetch(self, chat, limit):
+        chat_type, chat_id = chat
+        self.polls += 1
+
+        response = self.client._post(
+            "message/content",
+            data={
+                f"{chat_type}_id": chat_id,
+                "source": chat_type,
+                "limit": limit,
+                "offset": 0,
+            },
+        )
+        return [message for message in response["messages"] if message["kind"] == "message"]
+
+    def _reschedule(self, chat, active):
+        with self._lock:
+            if chat not in self.chats:
+                return
+
+            if active:
+                interval = self.min_interval
+            else:
+                interval = min(self.intervals[chat] * self.backoff, self.max_interval)
+
+            self.intervals[chat] = interval
+            self._due[chat] = time.monotonic() + interval
+
+    def _poll_notifications(self, deliver):
+        count = self.client.account.notification_count()
+        previous, self._notification_count = self._notification_count, count
+        delivered = 0
+
+        if previous is not None and count > previous:
+            notifications = self.client.account.notifications(limit=count - previous)
+
+            for notification in reversed(notifications):
+                deliver(self.notification_event, (notification,))
+                delivered += 1
+
+            self._notification_interval = self.min_interval
+        else:
+            self._notification_interval = min(
+                self._notification_interval * self.backoff, self.max_interval
+            )
+
+        self._notification_due = time.monotonic() + self._notification_interval
+        return delivered
+
+    def _next_due(self) -> float:
+        with self._lock:
+            times = list(self._due.values())
+
+        if self.notifications:
+            times.append(self._notification_due)
+
+        return min(times, default=time.monotonic() + self.max_interval)
@@ -0,0 +1,179 @@
+from .cache import TTLCache
+from .catchup import CatchUp
+from .client import Client
+from .dispatch import EventDispatcher
+from .scheduler import Scheduler
+
+
+class _SocketBridge:
+    """Lets the synchronous client code use a socket running on the pool loop."""
+
+    def __init__(self, sio, loop):
+        self._sio = sio
+        self._loop = loop
+
+    @property
+    def connected(self):
+        return self._sio.connected
+
+    def on(self, *args, **kwargs):
+        return self._sio.on(*args, **kwargs)
+
+    def emit(self, *args, **kwargs):
+        import asyncio
+
+        asyncio.run_coroutine_threadsafe(self._sio.emit(*args, **kwargs), self._loop)
+
+    def call(self, *args, **kwargs):
+        import asyncio
+
+        return asyncio.run_coroutine_threadsafe(
+            self._sio.call(*args, **kwargs), self._loop
+        ).result()
+
+
+class ClientPool:
+    """## Hosts many authenticated accounts in one process.
+
+    All accounts share one HTTP connection pool, one cache for users, one
+    asyncio loop for their push sockets, one worker pool for the event
+    handlers and one scheduler for their loops. Sessions and cookies,
+    private keys and conversation keys stay with each client.
+
+    The push sockets need aiohttp (`pip install stashconnect[pool]`).
+
+    #### Attributes:
+        .clients (list): The clients of the pool.
+        .adapter (requests.adapters.HTTPAdapter): The shared HTTP connection pool.
+        .cache (TTLCache): The shared cache.
+        .dispatcher (EventDispatcher): The shared handler worker pool.
+        .scheduler (Scheduler): The shared scheduler for @client.loop (runs at most
+            `loop_workers` loops at once).
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 4,
+        queue_size: int = 1000,
+        overflow: str = "drop_oldest",
+        pool_size: int = 20,
+        loop_workers: int = 4,
+        cache_ttl: float = 300,
+        proxy: dict = None,
+        cert_path: str = None,
+    ):
+        self.clients = []
+        self._proxy = proxy
+        self._cert_path = cert_path
+        self.adapter = Client._create_adapter(pool_size)
+        self.cache = TTLCache(ttl=cache_ttl)
+
+        # a blocking queue would stall the sockets of every account, so the
+        # oldest events are dropped (and counted) once a queue is full
+        self.dispatcher = EventDispatcher(
+            workers=workers, queue_size=queue_size, overflow=overflow
+        )
+        self.scheduler = Scheduler(max_workers=loop_workers)
+
+    def __iter__(self):
+        return iter(self.clients)
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __getitem__(self, index):
+        return self.clients[index]
+
+    def add(self, **kwargs) -> Client:
+        """## Logs in an account and adds it to the pool.
+
+        #### Args:
+            **kwargs: The Client arguments (email, password, encryption_password, ...).
+
+        #### Returns:
+            Client: The new client.
+        """
+        session = Client._create_session(
+            self._proxy, self._cert_path, adapter=self.adapter
+        )
+        client = Client(http_session=session, cache=self.cache, **kwargs)
+        client.dispatcher = self.dispatcher
+        client.scheduler = self.scheduler
+
+        self.clients.append(client)
+        return client
+
+    def run(self, debug: bool = False, *, catch_up: bool = True) -> None:
+        """## Starts the loops and listens for the events of all accounts.
+
+        #### Args:
+            debug (bool, optional): Log the socket traffic. Defaults to False.
+            catch_up (bool, optional): Deliver messages missed while reconnecting. Defaults to True.
+        """
+        if catch_up:
+            for client in self.clients:
+                client.catch_up = CatchUp(client)
+
+        if any(client.loops for client in self.clients):
+            self.scheduler.start()
+        self.dispatcher.start()
+
+        import asyncio
+
+        try:
+            asyncio.run(self._run(debug))
+        finally:
+            self.dispatcher.stop()
+            self.scheduler.stop()
+
+    async def _run(self, debug):
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "ClientPool needs aiohttp for its sockets: pip install stashconnect[pool]"
+            ) from None
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        sockets = [
+            (client, self._socket(client, loop, debug))
+            for client in self.clients
+            if client._socket_event_names()
+        ]
+
+        await asyncio.gather(
+            *(sio.connect(client._push_url, retry=True) for client, sio in sockets)
+        )
+        await asyncio.gather(*(sio.wait() for _, sio in sockets))
+
+    def _socket(self, client, loop, debug):
+        import socketio
+
+        sio = socketio.AsyncClient(
+            logger=debug,
+            engineio_logger=debug,
+            reconnection=True,
+            reconnection_attempts=0,
+            reconnection_delay=1,
+            reconnection_delay_max=30,
+        )
+
+        @sio.event
+        async def connect():
+            print(f"Connected {client.first_name} {client.last_name} to the server.")
+            await sio.emit("userid", client._socket_auth())
+            client._on_connected()
+
+        @sio.event
+        async def disconnect(*args):
+            print(f"Disconnected {client.first_name} {client.last_name} from the server")
+
+        # the handlers only queue the events, so they never block the loop
+        for event_name in client._socket_event_names():
+            sio.on(event_name)(client._socket_event(event_name))
+
+        client.sio = _SocketBridge(sio, loop)
+        return sio
@@ -0,0 +1,398 @@
+import collections
+import json
+import threading
+import time
+
+from .hedging import LatencyTracker
+from .timeouts import endpoint_name
+
+# never written to a recording, and ignored when matching requests
+IGNORED_FIELDS = ("password", "client_key", "device_id")
+
+# redacted wherever they show up in a recorded response (e.g. auth/login)
+SECRET_FIELDS = ("password", "client_key", "private_key", "socket_id", "hidden_id")
+REDACTED = "[redacted]"
+# shorter values are only redacted in their own field, not everywhere in the file
+MIN_SECRET_LENGTH = 8
+
+
+def _redact(value, secrets: set):
+    if isinstance(value, dict):
+        redacted = {}
+        for name, item in value.items():
+            if name in SECRET_FIELDS and isinstance(item, str) and item:
+                if len(item) >= MIN_SECRET_LENGTH:
+                    secrets.add(item)
+                redacted[name] = REDACTED
+            else:
+                redacted[name] = _redact(item, secrets)
+        return redacted
+
+    if isinstance(value, list):
+        return [_redact(item, secrets) for item in value]
+
+    return value
+
+
+def _request_key(url, data) -> str:
+    # the session receives full urls, recordings should not depend on the host
+    url = url.split("://", 1)[-1].partition("/")[2]
+    data = {name: value for name, value in (data or {}).items() if name not in IGNORED_FIELDS}
+    return f"{endpoint_name(url)} {json.dumps(data, sort_keys=True, default=str)}"
+
+
+def find_secrets(records) -> list:
+    """## Lists the secret fields that a recording holds in clear text.
+
+    #### Args:
+        records (iterable): The parsed JSONL records.
+
+    #### Returns:
+        list: (endpoint, field) tuples, empty for a clean recording.
+    """
+    found = []
+
+    def walk(value, endpoint):
+        if isinstance(value, dict):
+            for name, item in value.items():
+                if name in SECRET_FIELDS and isinstance(item, str) and item not in ("", REDACTED):
+                    found.append((endpoint, name))
+                else:
+                    walk(item, endpoint)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item, endpoint)
+
+    for record in records:
+        if record["type"] == "request":
+            try:
+                walk(json.loads(record["body"]), record["key"].split(" ", 1)[0])
+            except ValueError:
+                pass
+        else:
+            walk(record.get("args"), record.get("name"))
+
+    return found
+
+
+class RecordingSession:
+    """## A requests session that writes every response to an EventRecorder.
+
+    Everything else is passed to the wrapped session.
+    """
+
+    def __init__(self, session, recorder):
+        self._wrapped = session
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def post(self, url, data=None, **kwargs):
+        response = self._wrapped.post(url, data=data, **kwargs)
+        self._recorder.request(url, data, response)
+        return response
+
+
+class EventRecorder:
+    """## Records the raw socket events and REST responses of a client to JSONL.
+
+    Pass `recorder.session` as the `http_session` of the client and set
+    `client.recorder = recorder` to record its socket events. Recordings hold
+    the account data of the responses, so keep them private. Passwords,
+    client keys, socket ids and private keys are redacted, also where their
+    values show up again later, so a replay runs without the encryption
+    password.
+
+    #### Attributes:
+        .path (str): The JSONL file.
+        .session (RecordingSession): The recording HTTP session.
+        .events (int): The amount of recorded events.
+        .requests (int): The amount of recorded requests.
+    """
+
+    def __init__(self, path: str, *, proxy: dict = None, cert_path: str = None):
+        from .client import Client
+
+        self.path = path
+        self.session = RecordingSession(Client._create_session(proxy, cert_path), self)
+        self.events = 0
+        self.requests = 0
+
+        self._file = open(path, "a", encoding="utf-8")
+        self._start = time.monotonic()
+        self._secrets = set()
+        self._lock = threading.Lock()
+
+    def event(self, name: str, args: tuple) -> None:
+        """## Records a raw socket event."""
+        self._write({"type": "event", "name": name, "args": list(args)})
+        self.events += 1
+
+    def request(self, url: str, data: dict, response) -> None:
+        """## Records a REST response."""
+        secrets = {
+            str(value)
+            for name, value in (data or {}).items()
+            if name in SECRET_FIELDS and len(str(value)) >= MIN_SECRET_LENGTH
+        }
+        body = response.text
+
+        try:
+            body = json.dumps(_redact(json.loads(body), secrets))
+        except ValueError:
+            pass
+
+        with self._lock:
+            self._secrets |= secrets
+
+        self._write(
+            {
+                "type": "request",
+                "key": _request_key(url, data),
+                "status": response.status_code,
+                "body": body,
+            }
+        )
+        self.requests += 1
+
+    def _write(self, record):
+        record["t"] = round(time.monotonic() - self._start, 4)
+        line = json.dumps(record, separators=(",", ":"), default=str)
+
+        with self._lock:
+            # a secret that was seen once is never written, wherever it shows up
+            for secret in self._secrets:
+                for form in {secret, json.dumps(secret)[1:-1], json.dumps(json.dumps(secret))[3:-3]}:
+                    line = line.replace(form, REDACTED)
+
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """## Closes the recording."""
+        with self._lock:
+            self._file.close()
+
+
+class ReplaySession:
+    """## Answers requests with the responses of a recording.
+
+    Responses are matched by endpoint and request data. Repeated requests get
+    the recorded responses in order and the last one once they run out.
+
+    #### Attributes:
+        .requests (Counter): The amount of requests per endpoint.
+        .event_requests (Counter): The amount of requests per replayed event.
+        .unmatched (Counter): Requests per endpoint without a recorded response.
+    """
+
+    def __init__(self, records):
+        self.headers = {}
+        self.requests = collections.Counter()
+        self.event_requests = collections.Counter()
+        self.unmatched = collections.Counter()
+
+        self._responses = collections.defaultdict(collections.deque)
+        self._last = {}
+        self._lock = threading.Lock()
+        self._current = threading.local()
+
+        for record in records:
+            if record["type"] == "request":
+                self._responses[record["key"]].append(record)
+
+    def post(self, url, data=None, **kwargs):
+        import requests
+
+        key = _request_key(url, data)
+        endpoint = key.split(" ", 1)[0]
+
+        with self._lock:
+            self.requests[endpoint] += 1
+            event = getattr(self._current, "event", None)
+            if event is not None:
+                self.event_requests[event] += 1
+
+            queue = self._responses.get(key)
+            if queue:
+                record = self._last[key] = queue.popleft()
+            else:
+                record = self._last.get(key)
+
+            if record is None:
+                self.unmatched[endpoint] += 1
+
+        response = requests.Response()
+        response.url = url
+
+        if record is None:
+            response.status_code = 404
+            response._content = b"{}"
+        else:
+            response.status_code = record["status"]
+            response._content = record["body"].encode()
+
+        return response
+
+    def close(self):
+        pass
+
+
+class ReplaySocket:
+    """## Stands in for the socket.io client and plays back the recorded events."""
+
+    def __init__(self, events, session, *, speed: float = 1.0):
+        self.session = session
+        self.speed = speed
+        self.connected = False
+        self.emitted = []
+
+        self.latency = LatencyTracker(window=100000)
+        self.played = 0
+        self.skipped = 0
+
+        self._events = events
+        self._handlers = {}
+
+    def event(self, func):
+        self._handlers[func.__name__] = func
+        return func
+
+    def on(self, name, handler=None):
+        def register(handler):
+            self._handlers[name] = handler
+            return handler
+
+        return register if handler is None else register(handler)
+
+    def emit(self, *args, **kwargs):
+        self.emitted.append(args)
+
+    def connect(self, url, **kwargs):
+        self.connected = True
+        if "connect" in self._handlers:
+            self._handlers["connect"]()
+
+    def disconnect(self):
+        self.connected = False
+
+    def wait(self):
+        start = time.monotonic()
+
+        for record in self._events:
+            if self.speed:
+                delay = start + record["t"] / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            handler = self._handlers.get(record["name"])
+            if handler is None:
+                self.skipped += 1
+                continue
+
+            self.session._current.event = record["name"]
+            start_time = time.perf_counter()
+            try:
+                handler(*record["args"])
+            except Exception as e:
+                print(f"Error in handler for '{record['name']}': {e!r}")
+            self.latency.record(record["name"], time.perf_counter() - start_time)
+            self.session._current.event = None
+
+            self.played += 1
+
+        self.connected = False
+        if "disconnect" in self._handlers:
+            self._handlers["disconnect"]()
+
+
+class Replayer:
+    """## Replays a recording through the handlers of a client.
+
+    Pass `replayer.session` as the `http_session` of the client, so the login
+    and all handler requests are answered from the recording, register the
+    handlers and call `run`.
+
+    #### Attributes:
+        .path (str): The JSONL file.
+        .session (ReplaySession): The HTTP session answering from the recording.
+        .events (list): The recorded socket events.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, encoding="utf-8") as file:
+            records = [json.loads(line) for line in file if line.strip()]
+
+        leaked = find_secrets(records)
+        if leaked:
+            print(f"Warning: {path} holds unredacted secrets: {sorted(set(leaked))}")
+
+        self.session = ReplaySession(records)
+        self.events = [record for record in records if record["type"] == "event"]
+
+        if self.events:
+            # start with the first event, not with the login
+            offset = self.events[0]["t"]
+            for record in self.events:
+                record["t"] -= offset
+
+    def run(
+        self,
+        client,
+        *,
+        speed: float = 1.0,
+        workers: int = 0,
+        queue_size: int = 1000,
+        overflow: str = "block",
+    ) -> dict:
+        """## Feeds the events to the client and reports the handler performance.
+
+        #### Args:
+            client (Client): A client created with `http_session=replayer.session`.
+            speed (float, optional): The replay speed, 0 replays as fast as possible. Defaults to 1.0.
+            workers (int, optional): Worker threads for the handlers. Defaults to 0.
+            queue_size (int, optional): The queue bound per worker. Defaults to 1000.
+            overflow (str, optional): The overflow policy of the worker queues. Defaults to "block".
+                Requests are only counted per event without workers.
+
+        #### Returns:
+            dict: The throughput, the handler latencies and the requests.
+        """
+        from .dispatch import EventDispatcher
+
+        if workers > 0:
+            client.dispatcher = EventDispatcher(
+                workers=workers, queue_size=queue_size, overflow=overflow
+            )
+
+        self.session.requests.clear()
+        self.session.event_requests.clear()
+        self.session.unmatched.clear()
+
+        socket = ReplaySocket(self.events, self.session, speed=speed)
+
+        start_time = time.perf_counter()
+        client._run(sio=socket)
+        duration = time.perf_counter() - start_time
+
+        if client.dispatcher is not None:
+            # the handlers ran on the workers, the socket only measured the queueing
+            latency = client.dispatcher.latency.stats()
+        else:
+            latency = socket.latency.stats()
+
+        return {
+            "events": socket.played,
+            "skipped": socket.skipped,
+            "duration": round(duration, 3),
+            "throughput": round(socket.played / duration, 1) if duration else None,
+            "handlers": {
+                name: {**stats, "requests": self.session.event_requests[name]}
+                for name, stats in latency.items()
+            },
+            "requests": dict(self.session.requests),
+            "unmatched": dict(self.session.unmatched),
+        }
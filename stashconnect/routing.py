@@ -0,0 +1,191 @@
+from .dispatch import event_key
+from .models import Message
+
+
+def _id_set(ids) -> set | None:
+    if ids is None:
+        return None
+    if isinstance(ids, str | int):
+        ids = [ids]
+    return {str(id) for id in ids}
+
+
+class EventFilter:
+    """## Decides on the raw payload if an event is relevant for a handler.
+
+    The checks run before any Message is built, so ignored events are never
+    decrypted.
+
+    #### Attributes:
+        .channels (set): Channel ids to accept (or None for all).
+        .conversations (set): Conversation ids to accept (or None for all).
+        .senders (set): Sender ids to accept (or None for all).
+        .kinds (set): Message kinds to accept (or None for all).
+        .ignore_own (bool): If events caused by the client itself are skipped.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        channels: str | int | list = None,
+        conversations: str | int | list = None,
+        senders: str | int | list = None,
+        kinds: str | list = None,
+        ignore_own: bool = False,
+    ):
+        self.client = client
+        self.channels = _id_set(channels)
+        self.conversations = _id_set(conversations)
+        self.senders = _id_set(senders)
+        self.kinds = _id_set(kinds)
+        self.ignore_own = ignore_own
+
+    def matches(self, args: tuple) -> bool:
+        """## Checks the raw event arguments against the filter.
+
+        #### Args:
+            args (tuple): The raw socket.io event arguments.
+
+        #### Returns:
+            bool: If the event should be handled.
+        """
+        message = None
+        if args and isinstance(args[0], dict) and isinstance(args[0].get("message"), dict):
+            message = args[0]["message"]
+
+        if self.channels is not None or self.conversations is not None:
+            key = event_key(args)
+            if key is None:
+                return False
+
+            chat_type, chat_id = key.split(":", 1)
+            allowed = self.channels if chat_type == "channel" else self.conversations
+
+            if allowed is None or chat_id not in allowed:
+                return False
+
+        if self.kinds is not None:
+            if message is None or str(message.get("kind")) not in self.kinds:
+                return False
+
+        if self.senders is not None or self.ignore_own:
+            sender = self._sender(args, message)
+
+            if self.senders is not None and sender not in self.senders:
+                return False
+            if self.ignore_own and sender == str(self.client.user_id):
+                return False
+
+        return True
+
+    def _sender(self, args, message):
+        if message is not None:
+            sender = message.get("sender")
+            if isinstance(sender, dict):
+                sender = sender.get("id")
+            return str(sender)
+
+        # typing events are sent as (type, type_id, user_id)
+        if len(args) >= 3:
+            return str(args[2])
+
+        return None
+
+
+class Route:
+    """## A handler registered for an event with its filter."""
+
+    def __init__(self, func, event_filter: EventFilter):
+        self.func = func
+        self.filter = event_filter
+        self.wants_message = func.__name__ == "message_received"
+
+
+class EventRouter:
+    """## The dispatch table mapping event names to their handlers."""
+
+    def __init__(self, client):
+        self.client = client
+        self._routes = {}
+
+    def __len__(self):
+        return len(self._routes)
+
+    def __contains__(self, name):
+        return name in self._routes
+
+    def names(self) -> list:
+        """## Returns the registered event names."""
+        return list(self._routes)
+
+    def chats(self) -> set:
+        """## Returns the chats named in the handler filters.
+
+        #### Returns:
+            set: (type, id) tuples like ("channel", "123").
+        """
+        chats = set()
+
+        for routes in self._routes.values():
+            for route in routes:
+                for chat_type, ids in (
+                    ("channel", route.filter.channels),
+                    ("conversation", route.filter.conversations),
+                ):
+                    chats.update((chat_type, chat_id) for chat_id in ids or ())
+
+        return chats
+
+    def add(self, name: str, func, event_filter: EventFilter) -> Route:
+        """## Registers a handler for an event.
+
+        #### Args:
+            name (str): The event name.
+            func (callable): The handler.
+            event_filter (EventFilter): The filter checked before the handler runs.
+
+        #### Returns:
+            Route: The new route.
+        """
+        route = Route(func, event_filter)
+        self._routes.setdefault(name, []).append(route)
+        return route
+
+    def matches(self, name: str, args: tuple) -> bool:
+        """## Checks if any handler of an event wants the raw event."""
+        return any(route.filter.matches(args) for route in self._routes.get(name, ()))
+
+    def dispatch(self, name: str, args: tuple) -> int:
+        """## Runs all matching handlers of an event.
+
+        A Message is only built (and decrypted) once, and only if a matching
+        handler needs it.
+
+        #### Args:
+            name (str): The event name.
+            args (tuple): The raw socket.io event arguments.
+
+        #### Returns:
+            int: The amount of handlers that ran.
+        """
+        message = None
+        handled = 0
+
+        for route in self._routes.get(name, ()):
+            if not route.filter.matches(args):
+                continue
+
+            if route.wants_message:
+                if message is None:
+                    message = Message(self.client, args[0]["message"])
+                route.func(message)
+
+            elif len(args) == 1:
+                route.func(args[0])
+            else:
+                route.func(args)
+
+            handled += 1
+
+        return handled
@@ -0,0 +1,369 @@
+import concurrent.futures
+import datetime
+import heapq
+import itertools
+import random
+import threading
+import time
+
+MODES = ("fixed_rate", "fixed_delay")
+OVERLAP_POLICIES = ("skip", "queue", "allow")
+
+
+class CronSchedule:
+    """## A cron style schedule ("minute hour day month weekday").
+
+    Supports `*`, lists (`1,15`), ranges (`1-5`) and steps (`*/10`, `0-30/5`).
+    Weekdays run from 0 (sunday) to 6.
+    """
+
+    _ranges = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression: {expression!r}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, *limits) for field, limits in zip(fields, self._ranges)
+        )
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _parse(self, field, low, high) -> set:
+        values = set()
+
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step = part.split("/")
+                step = int(step)
+
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(value) for value in part.split("-"))
+            else:
+                start = end = int(part)
+
+            if start < low or end > high or step < 1:
+                raise ValueError(f"Invalid cron field: {field!r}")
+
+            values.update(range(start, end + 1, step))
+
+        return values
+
+    def _day_matches(self, moment) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+
+        # like cron, a restricted day and weekday match if either matches
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """## Returns the next matching minute after a moment.
+
+        #### Args:
+            moment (datetime.datetime): The start moment.
+
+        #### Returns:
+            datetime.datetime: The next run time.
+        """
+        moment = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                month = moment.month % 12 + 1
+                year = moment.year + (moment.month == 12)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + datetime.timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class Job:
+    """## A function scheduled by the Scheduler.
+
+    #### Attributes:
+        .name (str): The job name.
+        .interval (float): The interval in seconds (or None for cron jobs).
+        .cron (CronSchedule): The cron schedule (or None).
+        .mode (str): "fixed_rate" or "fixed_delay".
+        .jitter (float): The maximum random delay added to every run (seconds).
+        .overlap (str): "skip", "queue" or "allow" when a run is due while the last one is running.
+        .cancelled (bool): If the job was cancelled.
+    """
+
+    def __init__(
+        self,
+        func,
+        *,
+        interval: float = None,
+        cron: str = None,
+        mode: str = "fixed_rate",
+        jitter: float = 0,
+        overlap: str = "skip",
+        delay: float = 0,
+        name: str = None,
+    ):
+        if (interval is None) == (cron is None):
+            raise ValueError("A job needs either an interval or a cron expression")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if overlap not in OVERLAP_POLICIES:
+            raise ValueError(f"overlap must be one of {OVERLAP_POLICIES}")
+
+        self.func = func
+        self.name = name or getattr(func, "__name__", "job")
+        self.interval = interval
+        self.cron = CronSchedule(cron) if cron is not None else None
+        self.mode = mode
+        self.jitter = jitter
+        self.overlap = overlap
+        self.delay = delay
+        self.cancelled = False
+
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_error = None
+        self.last_runtime = None
+        self.total_runtime = 0.0
+        self.max_runtime = 0.0
+
+        self._running = 0
+        self._queued = False
+        self._base = None
+        self._cron_minute = None
+
+    def cancel(self) -> None:
+        """## Stops all future runs of the job."""
+        self.cancelled = True
+
+    def _first_run(self, now: float) -> float:
+        if self.cron is not None:
+            return self._next_cron(now)
+        self._base = now + self.delay
+        return self._base + self._jitter()
+
+    def _next_run(self, now: float) -> float:
+        if self.cron is not None:
+            return self._next_cron(now)
+
+        if self.mode == "fixed_delay":
+            return now + self.interval + self._jitter()
+
+        # fixed rate runs on a grid, so the runtime never shifts later runs
+        self._base += self.interval
+        if self._base <= now:
+            missed = int((now - self._base) // self.interval) + 1
+            self.skipped += missed
+            self._base += missed * self.interval
+
+        return self._base + self._jitter()
+
+    def _next_cron(self, now: float) -> float:
+        wall = datetime.datetime.now()
+
+        # runs wait on the monotonic clock; if the wall clock drifts or is set
+        # back, a minute must still never run twice
+        start = wall if self._cron_minute is None else max(wall, self._cron_minute)
+        self._cron_minute = self.cron.next_after(start)
+
+        delay = max(0.0, (self._cron_minute - wall).total_seconds())
+        return now + delay + self._jitter()
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.jitter) if self.jitter else 0
+
+    def stats(self) -> dict:
+        """## Returns the run metrics of the job.
+
+        #### Returns:
+            dict: Runs, failures, skipped runs and runtimes in milliseconds.
+        """
+        average = self.total_runtime / self.runs if self.runs else None
+
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "running": self._running,
+            "last_error": repr(self.last_error) if self.last_error else None,
+            "last_runtime": _ms(self.last_runtime),
+            "average_runtime": _ms(average),
+            "max_runtime": _ms(self.max_runtime),
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class Scheduler:
+    """## Runs all periodic jobs from one timer thread.
+
+    Due jobs are handed to a pool of `max_workers` threads, so a slow job does
+    not delay the others while fewer than `max_workers` runs are busy. Once
+    all workers are busy, due runs wait for a free worker. `max_workers` can
+    be changed until the scheduler is started.
+
+    #### Attributes:
+        .jobs (list): The scheduled jobs.
+        .max_workers (int): The size of the worker pool.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.jobs = []
+        self.max_workers = max_workers
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopped = False
+
+    def add(self, func, **options) -> Job:
+        """## Schedules a function.
+
+        #### Args:
+            func (callable): The function (called without arguments).
+            **options: The Job options (interval, cron, mode, jitter, overlap, delay, name).
+
+        #### Returns:
+            Job: The scheduled job.
+        """
+        job = Job(func, **options)
+
+        with self._condition:
+            self.jobs.append(job)
+            if self._thread is not None:
+                self._push(job, job._first_run(time.monotonic()))
+
+        return job
+
+    def start(self) -> None:
+        """## Starts the timer thread."""
+        with self._condition:
+            if self._thread is not None:
+                return
+
+            self._stopped = False
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="stashconnect-job"
+            )
+
+            now = time.monotonic()
+            for job in self.jobs:
+                self._push(job, job._first_run(now))
+
+            self._thread = threading.Thread(
+                target=self._loop, name="stashconnect-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, wait: bool = True) -> None:
+        """## Stops the scheduler.
+
+        #### Args:
+            wait (bool, optional): Wait for running jobs to finish. Defaults to True.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=wait)
+            self._thread = None
+
+    def join(self) -> None:
+        """## Blocks until the scheduler is stopped."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> dict:
+        """## Returns the metrics of every job.
+
+        #### Returns:
+            dict: The job metrics by job name.
+        """
+        return {job.name: job.stats() for job in self.jobs}
+
+    def _push(self, job, when):
+        heapq.heappush(self._heap, (when, next(self._counter), job))
+        self._condition.notify_all()
+
+    def _loop(self):
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                when, _, job = self._heap[0]
+                now = time.monotonic()
+
+                if when > now:
+                    self._condition.wait(when - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+
+                self._trigger(job, now)
+
+    def _trigger(self, job, now):
+        if job._running and job.overlap != "allow":
+            if job.overlap == "queue":
+                job._queued = True
+            else:
+                job.skipped += 1
+        else:
+            job._running += 1
+            self._executor.submit(self._execute, job)
+
+        # fixed delay jobs are rescheduled once their run is finished
+        if job.mode == "fixed_rate" or job.cron is not None:
+            self._push(job, job._next_run(now))
+
+    def _execute(self, job):
+        while True:
+            start_time = time.perf_counter()
+
+            try:
+                job.func()
+            except Exception as e:
+                job.failures += 1
+                job.last_error = e
+                print(f"Error in loop '{job.name}': {e!r}")
+
+            runtime = time.perf_counter() - start_time
+            job.runs += 1
+            job.last_runtime = runtime
+            job.total_runtime += runtime
+            job.max_runtime = max(job.max_runtime, runtime)
+
+            with self._condition:
+                if job._queued and not job.cancelled and not self._stopped:
+                    job._queued = False
+                    continue
+
+                job._running -= 1
+
+                if job.mode == "fixed_delay" and job.cron is None and not job.cancelled:
+                    self._push(job, job._next_run(time.monotonic()))
+                return
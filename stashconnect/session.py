@@ -0,0 +1,108 @@
+import json
+import os
+
+
+class SessionStore:
+    """## A sealed session file on the local disk.
+
+    The file stores the client key, the login user info and the unlocked
+    private key, encrypted with AES-GCM under a key derived from a local secret.
+
+    #### Attributes:
+        .path (str): The location of the session file.
+    """
+
+    version = 1
+    kdf_rounds = 10000
+
+    def __init__(self, path: str, secret: str | bytes):
+        self.path = path
+        self._secret = secret.encode("utf-8") if isinstance(secret, str) else secret
+
+    def _derive_key(self, salt: bytes) -> bytes:
+        import Crypto.Hash.SHA256
+        import Crypto.Protocol.KDF
+
+        return Crypto.Protocol.KDF.PBKDF2(
+            self._secret,
+            salt,
+            dkLen=32,
+            count=self.kdf_rounds,
+            hmac_hash_module=Crypto.Hash.SHA256,
+        )
+
+    def load(self) -> dict | None:
+        """## Loads and unseals the session file.
+
+        #### Returns:
+            dict | None: The session data or None if the file is missing or invalid.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                sealed = json.load(file)
+
+            if sealed.get("v") != self.version:
+                return None
+
+            import Crypto.Cipher.AES
+
+            cipher = Crypto.Cipher.AES.new(
+                self._derive_key(bytes.fromhex(sealed["salt"])),
+                Crypto.Cipher.AES.MODE_GCM,
+                nonce=bytes.fromhex(sealed["nonce"]),
+            )
+            plain = cipher.decrypt_and_verify(
+                bytes.fromhex(sealed["data"]), bytes.fromhex(sealed["tag"])
+            )
+            return json.loads(plain.decode("utf-8"))
+
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, data: dict) -> None:
+        """## Seals and writes the session file.
+
+        #### Args:
+            data (dict): The session data.
+        """
+        import Crypto.Cipher.AES
+        import Crypto.Random
+
+        salt = Crypto.Random.get_random_bytes(16)
+        cipher = Crypto.Cipher.AES.new(
+            self._derive_key(salt), Crypto.Cipher.AES.MODE_GCM
+        )
+        encrypted, tag = cipher.encrypt_and_digest(json.dumps(data).encode("utf-8"))
+
+        sealed = {
+            "v": self.version,
+            "salt": salt.hex(),
+            "nonce": cipher.nonce.hex(),
+            "tag": tag.hex(),
+            "data": encrypted.hex(),
+        }
+
+        # write to a unique temporary file first, so a crash never leaves a broken
+        # session and several processes can save the same session at once
+        import tempfile
+
+        directory, name = os.path.split(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=f"{name}.", suffix=".tmp", dir=directory)
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(sealed, file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def clear(self) -> None:
+        """## Deletes the session file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,251 @@
+import bisect
+import hashlib
+import queue as queues
+import signal
+import threading
+
+from .dispatch import event_key
+
+
+class HashRing:
+    """## Maps keys to shards with consistent hashing.
+
+    Every shard owns `replicas` points on the ring, so adding or removing a
+    shard only moves the keys of its neighbours. The hash is stable across
+    processes and runs.
+
+    #### Attributes:
+        .shards (list): The shards on the ring.
+        .replicas (int): The virtual points per shard.
+    """
+
+    def __init__(self, shards=(), replicas: int = 64):
+        self.shards = []
+        self.replicas = replicas
+
+        self._points = []
+        self._owners = []
+
+        for shard in shards:
+            self.add(shard)
+
+    @staticmethod
+    def _hash(value) -> int:
+        return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], "big")
+
+    def add(self, shard) -> None:
+        """## Adds a shard to the ring."""
+        for replica in range(self.replicas):
+            point = self._hash(f"{shard}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, shard)
+
+        self.shards.append(shard)
+
+    def remove(self, shard) -> None:
+        """## Removes a shard from the ring."""
+        kept = [
+            (point, owner)
+            for point, owner in zip(self._points, self._owners)
+            if owner != shard
+        ]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+        self.shards.remove(shard)
+
+    def get(self, key):
+        """## Returns the shard owning a key."""
+        if not self._points:
+            raise ValueError("The ring has no shards")
+
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+def _worker_main(factory, queue, index):
+    # the supervisor stops the workers with a sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    client = factory()
+
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+
+        name, args = item
+        try:
+            client.events.dispatch(name, args)
+        except Exception as e:
+            print(f"Error in shard {index} handler for '{name}': {e!r}")
+
+
+class ProcessDispatcher:
+    """## Runs event handlers in worker processes.
+
+    Works like EventDispatcher, but the events are partitioned by chat onto
+    processes. Every worker builds its own client with `factory`, so it has
+    its own session and key store, and handles the events of its chats in
+    order.
+
+    A worker that died is restarted on its next event (up to `max_restarts`
+    times), its queued events are kept. Events that can not be queued within
+    `put_timeout` seconds, or whose worker can not be restarted, are dropped
+    and counted, so the socket thread never hangs on a full queue.
+
+    #### Attributes:
+        .processes (int): The amount of worker processes.
+        .ring (HashRing): Maps chats to workers.
+        .submitted (list): The amount of events sent to each worker.
+        .dropped (list): The amount of events dropped per worker.
+        .restarts (list): The amount of restarts per worker.
+    """
+
+    def __init__(
+        self,
+        factory,
+        *,
+        processes: int = 4,
+        queue_size: int = 1000,
+        context=None,
+        put_timeout: float = 1,
+        max_restarts: int = 5,
+    ):
+        import multiprocessing
+
+        self.factory = factory
+        self.processes = processes
+        self.put_timeout = put_timeout
+        self.max_restarts = max_restarts
+        self.ring = HashRing(range(processes))
+        self.submitted = [0] * processes
+        self.dropped = [0] * processes
+        self.restarts = [0] * processes
+
+        self._context = multiprocessing.get_context(context)
+        self._queues = [self._context.Queue(queue_size) for _ in range(processes)]
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _spawn(self, index):
+        worker = self._context.Process(
+            target=_worker_main,
+            args=(self.factory, self._queues[index], index),
+            name=f"stashconnect-shard-{index}",
+            daemon=True,
+        )
+        worker.start()
+        return worker
+
+    def start(self) -> None:
+        """## Starts the worker processes."""
+        self._workers = [self._spawn(index) for index in range(self.processes)]
+
+    def _ensure_alive(self, index) -> bool:
+        worker = self._workers[index]
+        if worker.is_alive():
+            return True
+
+        with self._lock:
+            worker = self._workers[index]
+            if worker.is_alive():
+                return True
+
+            if self.restarts[index] >= self.max_restarts:
+                return False
+
+            self.restarts[index] += 1
+            print(
+                f"Shard {index} died (exit code {worker.exitcode}), "
+                f"restarting ({self.restarts[index]}/{self.max_restarts})"
+            )
+            self._workers[index] = self._spawn(index)
+            return True
+
+    def stop(self, timeout: float = None) -> None:
+        """## Stops the workers after the queued events are handled.
+
+        #### Args:
+            timeout (float, optional): The maximum time to wait per worker. Defaults to None.
+        """
+        for queue, worker in zip(self._queues, self._workers):
+            if worker.is_alive():
+                try:
+                    queue.put(None, timeout=self.put_timeout)
+                except queues.Full:
+                    worker.terminate()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+    def submit(self, name: str, args: tuple, handler=None) -> None:
+        """## Queues an event for the worker owning its chat.
+
+        #### Args:
+            name (str): The event name.
+            args (tuple): The raw event arguments.
+            handler (callable, optional): Ignored, the workers use the handlers of their own client.
+        """
+        key = event_key(args)
+        index = self.ring.get(name if key is None else key)
+
+        if not self._ensure_alive(index):
+            self.dropped[index] += 1
+            return
+
+        try:
+            self._queues[index].put((name, args), timeout=self.put_timeout)
+        except queues.Full:
+            # a stuck worker must not block the socket thread
+            self.dropped[index] += 1
+            return
+
+        self.submitted[index] += 1
+
+    def stats(self) -> dict:
+        """## Returns the amount of events per worker.
+
+        #### Returns:
+            dict: The dispatcher statistics.
+        """
+        return {
+            "submitted": list(self.submitted),
+            "dropped": list(self.dropped),
+            "restarts": list(self.restarts),
+            "alive": [worker.is_alive() for worker in self._workers],
+        }
+
+
+def run_sharded(
+    factory,
+    processes: int = 4,
+    *,
+    queue_size: int = 1000,
+    debug: bool = False,
+    catch_up: bool = True,
+    context: str = None,
+) -> None:
+    """## Runs a bot with its event handlers spread over several processes.
+
+    `factory` builds the client and registers its handlers. It is called once
+    in the supervisor, which owns the push socket, filters the events and runs
+    the loops, and once in every worker process. It has to be a module level
+    function so it can be sent to the workers. A `session_file` saves the
+    workers a full login; the processes may share it, every save replaces the
+    file atomically.
+
+    #### Args:
+        factory (callable): Returns a configured Client.
+        processes (int, optional): The amount of worker processes. Defaults to 4.
+        queue_size (int, optional): The queue bound per worker. Defaults to 1000.
+        debug (bool, optional): Log the socket traffic. Defaults to False.
+        catch_up (bool, optional): Deliver messages missed while reconnecting. Defaults to True.
+        context (str, optional): The multiprocessing start method. Defaults to the platform default.
+    """
+    client = factory()
+    client.dispatcher = ProcessDispatcher(
+        factory, processes=processes, queue_size=queue_size, context=context
+    )
+    client.run(debug=debug, catch_up=catch_up)
@@ -0,0 +1,230 @@
+import threading
+
+from .models import Channel, Conversation
+from .timeouts import map_concurrent
+
+# the fields that tell if a chat changed since the last sync
+WATCHED_FIELDS = ("last_action", "last_activity", "unread", "unread_messages")
+
+
+def _changed(old: dict, new: dict) -> bool:
+    return any(old.get(field) != new.get(field) for field in WATCHED_FIELDS)
+
+
+def _last_action(chat: dict) -> int:
+    try:
+        return int(chat.get("last_action") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ChatSync:
+    """## Keeps a local snapshot of the joined channels and conversations.
+
+    Every sync lists the chats as raw dicts and compares last_action,
+    last_activity and the unread counters with the snapshot, so only the
+    changed chats are reported and nothing is rebuilt for the others.
+
+    The conversation listing is sorted by last_action, so an incremental
+    sync stops paging at the first page that is older than the previous
+    sync. Every `full_every` syncs all pages are read to also notice
+    conversations that were left, archived or read on another device. The
+    joined channels have no paging, so channels/subscripted is fetched in
+    full for every company on every sync; only the comparison is incremental.
+
+    The changes are delivered as events with a raw payload like
+    {"type": "channel", "channel_id": "1", "change": "changed", "chat": {...},
+    "previous": {...}}, so handlers can use the usual channel and
+    conversation filters.
+
+    #### Attributes:
+        .snapshot (dict): The chats mapped by (type, id) to their last listing.
+        .syncs (int): The amount of finished syncs.
+        .requests (int): The amount of listing requests.
+    """
+
+    def __init__(
+        self,
+        client,
+        companies: str | int | list = None,
+        *,
+        conversations: bool = True,
+        page_size: int = 100,
+        full_every: int = 10,
+        concurrency: int = 4,
+        added_event: str = "chat_added",
+        changed_event: str = "chat_changed",
+        removed_event: str = "chat_removed",
+    ):
+        self.client = client
+        if isinstance(companies, str | int):
+            companies = [companies]
+        self.companies = None if companies is None else [str(id) for id in companies]
+
+        self.conversations = conversations
+        self.page_size = page_size
+        self.full_every = full_every
+        self.concurrency = concurrency
+        self.events = {
+            "added": added_event,
+            "changed": changed_event,
+            "removed": removed_event,
+        }
+
+        self.snapshot = {}
+        self.syncs = 0
+        self.requests = 0
+
+        self._lock = threading.Lock()
+
+    def _post(self, url, data):
+        with self._lock:
+            self.requests += 1
+        return self.client._post(url, data=data)
+
+    def _company_ids(self) -> list:
+        if self.companies is None:
+            response = self._post("company/member", {"no_cache": True})
+            self.companies = [str(company["id"]) for company in response["companies"]]
+        return self.companies
+
+    def _channels(self, company_id) -> list:
+        response = self._post("channels/subscripted", {"company": company_id})
+        return response["channels"]
+
+    def _conversations(self, full: bool) -> tuple[list, bool]:
+        with self._lock:
+            known = {
+                chat_id: chat
+                for (chat_type, chat_id), chat in self.snapshot.items()
+                if chat_type == "conversation"
+            }
+        watermark = max(map(_last_action, known.values()), default=None)
+
+        conversations = []
+        complete = True
+
+        while True:
+            response = self._post(
+                "message/conversations",
+                data={"limit": self.page_size, "offset": len(conversations), "archive": 0},
+            )
+            page = response["conversations"]
+            conversations.extend(page)
+
+            if len(page) < self.page_size:
+                return conversations, complete
+
+            if full or watermark is None:
+                continue
+
+            actions = [_last_action(chat) for chat in page]
+            if actions != sorted(actions, reverse=True):
+                # not sorted by activity, every page has to be read
+                full = True
+                continue
+
+            if actions[-1] < watermark and all(
+                str(chat["id"]) in known and not _changed(known[str(chat["id"])], chat)
+                for chat in page
+                if _last_action(chat) < watermark
+            ):
+                # the remaining pages are older than the previous sync
+                complete = False
+                return conversations, complete
+
+    def sync(self, deliver=None, *, full: bool = None) -> list:
+        """## Lists the chats and reports what changed since the last sync.
+
+        The first sync only fills the snapshot and reports nothing.
+
+        #### Args:
+            deliver (callable, optional): Called with (name, args) for every change. Defaults to the client handlers.
+            full (bool, optional): Read every conversation page. Defaults to every `full_every` syncs.
+
+        #### Returns:
+            list: The change payloads.
+        """
+        if deliver is None:
+            deliver = self.client._deliver_event
+        if full is None:
+            full = self.full_every is not None and self.syncs % self.full_every == 0
+
+        listed, complete = self._list(full)
+        changes = []
+
+        with self._lock:
+            first = self.syncs == 0
+
+            for key, chat in listed.items():
+                previous = self.snapshot.get(key)
+
+                if previous is None:
+                    changes.append(self._change("added", key, chat, None))
+                elif _changed(previous, chat):
+                    changes.append(self._change("changed", key, chat, previous))
+
+                self.snapshot[key] = chat
+
+            for key in list(self.snapshot):
+                if key not in listed and complete[key[0]]:
+                    changes.append(self._change("removed", key, None, self.snapshot.pop(key)))
+
+            self.syncs += 1
+
+        if first:
+            return []
+
+        for change in changes:
+            deliver(self.events[change["change"]], (change,))
+
+        return changes
+
+    def _list(self, full: bool) -> tuple[dict, dict]:
+        def fetch(source):
+            if source == "conversations":
+                return self._conversations(full)
+            return self._channels(source), True
+
+        sources = list(self._company_ids())
+        if self.conversations:
+            sources.append("conversations")
+
+        listed = {}
+        complete = {"channel": True, "conversation": True}
+
+        for source, (chats, done) in zip(
+            sources, map_concurrent(fetch, sources, self.concurrency)
+        ):
+            chat_type = "conversation" if source == "conversations" else "channel"
+            complete[chat_type] &= done
+
+            for chat in chats:
+                listed[(chat_type, str(chat["id"]))] = chat
+
+        return listed, complete
+
+    def _change(self, kind, key, chat, previous) -> dict:
+        chat_type, chat_id = key
+        return {
+            "type": chat_type,
+            f"{chat_type}_id": chat_id,
+            "change": kind,
+            "chat": chat,
+            "previous": previous,
+        }
+
+    def build(self, change: dict):
+        """## Builds the Channel or Conversation object of a change.
+
+        #### Args:
+            change (dict): A change payload.
+
+        #### Returns:
+            Channel | Conversation: The chat object (None for removed chats).
+        """
+        if change["chat"] is None:
+            return None
+        if change["type"] == "channel":
+            return Channel(self.client, change["chat"])
+        return Conversation(self.client, change["chat"])
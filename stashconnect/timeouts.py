@@ -0,0 +1,150 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import time
+
+# default timeouts (seconds) per endpoint class
+DEFAULT_TIMEOUTS = {
+    "metadata": 10,
+    "send": 20,
+    "upload": 60,
+    "download": 120,
+}
+
+ENDPOINT_CLASSES = {
+    "message/send": "send",
+    "message/createEncryptedConversation": "send",
+    "channels/create": "send",
+    "channels/createInvite": "send",
+    "security/set_file_access_key": "send",
+    "file/upload": "upload",
+    "file/storePreviewImage": "upload",
+    "account/store_profile_image": "upload",
+    "file/download": "download",
+}
+
+_deadline = contextvars.ContextVar("stashconnect_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call runs past its deadline."""
+
+
+def endpoint_name(url: str) -> str:
+    """## Strips the query and slashes from a request url.
+
+    #### Args:
+        url (str): The requested url (e.g. "/file/download?id=1").
+
+    #### Returns:
+        str: The endpoint (e.g. "file/download").
+    """
+    return url.split("?")[0].strip("/")
+
+
+def endpoint_class(url: str) -> str:
+    """## Returns the timeout class of an endpoint.
+
+    #### Args:
+        url (str): The endpoint (e.g. "message/send").
+
+    #### Returns:
+        str: "metadata", "send", "upload" or "download".
+    """
+    return ENDPOINT_CLASSES.get(endpoint_name(url), "metadata")
+
+
+def remaining() -> float | None:
+    """## Returns the time left until the current deadline.
+
+    #### Returns:
+        float | None: The remaining seconds or None if no deadline is set.
+    """
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds: float = None, *, expires: float = None):
+    """## Sets a deadline for all requests made inside the block.
+
+    Nested scopes can only shorten the deadline, never extend it.
+
+    #### Args:
+        seconds (float, optional): The time budget from now. Defaults to None.
+        expires (float, optional): An absolute time.monotonic() deadline. Defaults to None.
+    """
+    if seconds is not None:
+        expires = time.monotonic() + seconds
+
+    current = _deadline.get()
+    if expires is None or (current is not None and current <= expires):
+        yield
+        return
+
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def with_deadline(func):
+    """## Adds a `deadline=` keyword (seconds) to a manager method.
+
+    Every request made by the method, including nested manager calls,
+    shares the same deadline.
+    """
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def generator_wrapper(*args, deadline: float = None, **kwargs):
+            # the generator body runs on iteration, so the deadline is fixed now
+            expires = None if deadline is None else time.monotonic() + deadline
+            generator = func(*args, **kwargs)
+
+            while True:
+                with deadline_scope(expires=expires):
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                yield item
+
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, deadline: float = None, **kwargs):
+        with deadline_scope(deadline):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def map_concurrent(func, items, concurrency: int = 8) -> list:
+    """## Runs func for every item on a thread pool, keeping the callers deadline.
+
+    #### Args:
+        func (callable): Called with one item.
+        items (iterable): The items.
+        concurrency (int, optional): The maximum amount of parallel calls. Defaults to 8.
+
+    #### Returns:
+        list: The results in the order of the items.
+    """
+    items = list(items)
+
+    if concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    import concurrent.futures
+
+    with concurrent.futures.ThreadPoolExecutor(min(concurrency, len(items))) as executor:
+        # every call gets its own copy, contexts can not be entered twice at once
+        futures = [
+            executor.submit(contextvars.copy_context().run, func, item) for item in items
+        ]
+        return [future.result() for future in futures]
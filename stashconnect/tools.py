@@ -11,6 +11,19 @@ class Tools:
         if type_id == self.client.user_id:
             return "personal"
 
+        key = ("type", str(self.client.user_id), str(type_id))
+        target_type = self.client.cache.get(key)
+
+        if target_type is None:
+            target_type = self._get_type(type_id)
+
+            # a chat never changes its type, only unknown ids are checked again
+            if target_type != "404":
+                self.client.cache.set(key, target_type, ttl=None)
+
+        return target_type
+
+    def _get_type(self, type_id):
         conversation_data = {
             "conversation_id": type_id,
             "source": "conversation",
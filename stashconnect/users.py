@@ -1,4 +1,7 @@
+import hashlib
+
 from .models import User
+from .timeouts import map_concurrent, with_deadline
 
 
 class UserManager:
@@ -15,17 +18,55 @@ class UserManager:
         #### Returns:
             dict: A user as a dict.
         """
-        response = self.client._post(
-            "users/info", data={"user_id": user_id, "withkey": withkey}
+        # user profiles are the same for every account, so the cache can be shared
+        return self.client.cache.get_or_set(
+            ("user", str(user_id), bool(withkey)),
+            lambda: self.client._post(
+                "users/info", data={"user_id": user_id, "withkey": withkey}
+            )["user"],
+            copy=True,
+        )
+
+    def public_keys(self, user_ids: list, *, concurrency: int = 8) -> dict:
+        """## Fetches the users and their parsed public keys.
+
+        The user infos are fetched concurrently. Parsed keys are cached by user
+        id and key fingerprint, so a changed key is parsed again.
+
+        #### Args:
+            user_ids (list): The users ids.
+            concurrency (int, optional): The maximum amount of parallel requests. Defaults to 8.
+
+        #### Returns:
+            dict: The (user dict, public key) tuple per user id (as str).
+        """
+        user_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+        users = map_concurrent(self._info, user_ids, concurrency)
+
+        return {
+            user_id: (user, self._public_key(user))
+            for user_id, user in zip(user_ids, users)
+        }
+
+    def _public_key(self, user: dict):
+        public_key = user["public_key"]
+        fingerprint = hashlib.sha256(public_key.encode("utf-8")).hexdigest()
+
+        # parsed keys belong to one backend; the fingerprint keeps them valid forever
+        return self.client.cache.get_or_set(
+            ("public_key", self.client.crypto.name, str(user["id"]), fingerprint),
+            lambda: self.client.crypto.load_public_key(public_key),
+            ttl=None,
         )
-        return response["user"]
 
+    @with_deadline
     def info(self, user_id: str | int, withkey: bool = True) -> User:
         """## Gets a users user info.
 
         #### Args:
             user_id (str | int): The users id
             withkey (bool, optional): Return key. Defaults to True.
+            deadline (float, optional): The time budget (seconds) for all requests of this call. Defaults to None.
 
         #### Returns:
             User: A user object.